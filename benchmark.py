@@ -0,0 +1,197 @@
+import argparse
+import contextlib
+import csv
+import datetime
+import io
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+import local as lcl
+import main
+
+# ==========================
+# СИНТЕТИЧЕСКИЕ ТРАНЗАКЦИИ
+# ==========================
+
+SIZES = (10_000, 1_000_000, 10_000_000)
+FORMATS = ("memory", "csv", "json")
+
+MERCHANT_SUFFIXES = ("", "", " ООО", " ИП", " №12", " онлайн", " москва", " card *1234")
+NOISE_WORDS = ("оплата", "покупка", "перевод", "списание", "платёж")
+INCOME_KEYWORDS = (lcl.SALARY, lcl.STIPEND, lcl.BONUS, lcl.CREDITING, lcl.PROFIT, lcl.DIVIDEND)
+
+
+def _keywords() -> list:
+    # слова из правил категоризации плюс немного строк из local.py, которые ни с чем не совпадают
+    words = sorted({keyword for keywords in main.all_categories().values() for keyword in keywords if keyword})
+    return words + [lcl.COFFEE_SHOP, lcl.BEAUTY]
+
+
+def generate_transactions(count: int, seed: int = 0, start: datetime.date = datetime.date(2022, 1, 1),
+                          days: int = 3 * 365):
+    """Лениво выдаёт count транзакций с реалистичными датами, суммами и описаниями"""
+    rnd = random.Random(seed)
+    keywords = _keywords()
+    start_ordinal = start.toordinal()
+    for _ in range(count):
+        date = datetime.date.fromordinal(start_ordinal + rnd.randrange(days)).isoformat()
+        if rnd.random() < 0.08:
+            amount = round(rnd.uniform(20_000, 150_000), 2)
+            description = f"{rnd.choice(INCOME_KEYWORDS).capitalize()}{rnd.choice(MERCHANT_SUFFIXES)}"
+        else:
+            amount = -round(rnd.lognormvariate(6.5, 1.2), 2)
+            keyword = rnd.choice(keywords)
+            if rnd.random() < 0.5:
+                keyword = f"{rnd.choice(NOISE_WORDS)} {keyword}"
+            description = f"{keyword.capitalize()}{rnd.choice(MERCHANT_SUFFIXES)}"
+        yield {"date": date, "amount": amount, "description": description}
+
+
+def write_csv(filename: str, rows):
+    with open(filename, "w", encoding="utf-8", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=["date", "amount", "description"])
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def write_json(filename: str, rows):
+    # пишется по элементу, чтобы 10 млн строк не собирались в памяти целиком
+    with open(filename, "w", encoding="utf-8") as file:
+        file.write('{"transactions": [')
+        for index, row in enumerate(rows):
+            if index:
+                file.write(",\n")
+            file.write(json.dumps(row, ensure_ascii=False))
+        file.write("]}")
+
+
+# ==========================
+# ЗАМЕРЫ
+# ==========================
+
+def measure(name: str, rows: int, func, trace_memory: bool = True) -> tuple:
+    """Выполняет func и возвращает (результат, строка отчёта: время, строк/с, пик памяти)"""
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - started
+    peak = None
+    if trace_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result, {
+        "stage": name,
+        "rows": rows,
+        "seconds": elapsed,
+        "rows_per_second": rows / elapsed if elapsed else float("inf"),
+        "peak_mb": None if peak is None else peak / 1e6,
+    }
+
+
+def _quiet(func, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args, **kwargs)
+
+
+def bench_size(size: int, formats: tuple, workdir: str, seed: int, trace_memory: bool) -> list:
+    results = []
+    transactions = None
+
+    if "memory" in formats:
+        transactions, row = measure("generate (memory)", size,
+                                    lambda: [main.make_transaction(**t) for t in generate_transactions(size, seed)],
+                                    trace_memory)
+        results.append(row)
+
+    for fmt in formats:
+        if fmt == "memory":
+            continue
+        filename = os.path.join(workdir, f"bench_{size}.{fmt}")
+        if not os.path.exists(filename):
+            (write_csv if fmt == "csv" else write_json)(filename, generate_transactions(size, seed))
+        loaded, row = measure(f"import_financial_data ({fmt})", size,
+                              lambda: main.import_financial_data(filename), trace_memory)
+        results.append(row)
+        if transactions is None:
+            transactions = loaded
+        del loaded
+        _, row = measure(f"smart_piggy_bank stream ({fmt})", size,
+                         lambda: _quiet(main.smart_piggy_bank, filename, None, cache_dir=None,
+                                        chart_dir=workdir, chart_formats=()),
+                         trace_memory)
+        results.append(row)
+        cache_dir = os.path.join(workdir, "cache")
+        for label in ("cold", "warm"):
+            _, row = measure(f"smart_piggy_bank cache {label} ({fmt})", size,
+                             lambda: _quiet(main.smart_piggy_bank, filename, None, cache_dir=cache_dir,
+                                            chart_dir=workdir, chart_formats=()),
+                             trace_memory)
+            results.append(row)
+
+    if transactions is None:
+        return results
+
+    _, row = measure("categorize_all_transactions", size,
+                     lambda: main.categorize_all_transactions(transactions), trace_memory)
+    results.append(row)
+
+    for func in (main.calculate_basic_stats, main.calculate_by_category, main.analyze_by_time,
+                 main.analyze_seasonal_trends, main.analyze_historical_spending, main.aggregate):
+        _, row = measure(func.__name__, size, lambda: func(transactions), trace_memory)
+        results.append(row)
+
+    analysis = main.analyze_historical_spending(transactions)
+    budget = main.create_budget_template(analysis)
+    _, row = measure("compare_budget_vs_actual", size,
+                     lambda: main.compare_budget_vs_actual(budget, transactions), trace_memory)
+    results.append(row)
+    return results
+
+
+def format_results(results: list) -> str:
+    lines = [f"{'stage':<42}{'rows':>12}{'seconds':>10}{'rows/s':>14}{'peak MB':>10}"]
+    for row in results:
+        peak = "-" if row["peak_mb"] is None else f"{row['peak_mb']:.1f}"
+        lines.append(f"{row['stage']:<42}{row['rows']:>12}{row['seconds']:>10.3f}"
+                     f"{row['rows_per_second']:>14,.0f}{peak:>10}")
+    return "\n".join(lines)
+
+
+def run(sizes: tuple = SIZES, formats: tuple = FORMATS, workdir: str = None, seed: int = 0,
+        trace_memory: bool = True) -> list:
+    """Прогоняет замеры для всех размеров и форматов; файлы данных создаются в workdir"""
+    results = []
+    with contextlib.ExitStack() as stack:
+        if workdir is None:
+            workdir = stack.enter_context(tempfile.TemporaryDirectory(prefix="piggy_bench_"))
+        os.makedirs(workdir, exist_ok=True)
+        for size in sizes:
+            size_results = bench_size(size, formats, workdir, seed, trace_memory)
+            print(f"\n# {size} rows")
+            print(format_results(size_results))
+            results.extend(size_results)
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks for the smart piggy bank pipeline")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=list(FORMATS))
+    parser.add_argument("--workdir", help="directory for generated files (kept between runs)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="skip tracemalloc (faster, no peak memory)")
+    parser.add_argument("--json", dest="json_path", help="also write results as JSON")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    benchmark_results = run(tuple(args.sizes), tuple(args.formats), args.workdir, args.seed, not args.no_memory)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as out:
+            json.dump(benchmark_results, out, indent=2)
@@ -0,0 +1,251 @@
+import json
+import os
+import statistics
+from collections import Counter
+
+import local as lcl
+from dates import decode_date, month_key, quarter_of, in_period
+from frame import TransactionFrame, NO_CODE, _category_labels
+
+# ==========================
+# КУБ КАТЕГОРИЯ × МЕСЯЦ × ДОХОД/РАСХОД
+# ==========================
+
+CUBE_VERSION = 2
+CUBE_SUFFIX = ".cube.json"
+# месяц для строк с некорректной датой: они учитываются в итогах, но не в отчётах по периодам
+UNDATED = ""
+
+
+def cube_path(filename: str) -> str:
+    """Куб хранится рядом с файлом данных: money.csv -> money.csv.cube.json"""
+    return f"{filename}{CUBE_SUFFIX}"
+
+
+def _year(month: str) -> str:
+    return month[:4]
+
+
+class RollupCube:
+    """Суммы и количества операций по (месяц, доход/расход, категория).
+
+    Отчёты по месяцам, кварталам и годам, средние траты и сравнение с бюджетом
+    считаются по ячейкам куба, без исходных строк; куб дополняется новыми транзакциями.
+    Ячейка помнит номер своей первой строки, поэтому порядок категорий и выбор при
+    равенстве в отчётах за квартал и год — как у функций по строкам. Суммы за период
+    складываются по месяцам, поэтому в последних знаках могут отличаться от сложения по строкам.
+    """
+
+    def __init__(self):
+        # месяц 'YYYY-MM' -> {"income": {категория: [сумма, количество, первая строка]}, "expenses": {...}}
+        self.cells = {}
+        # число учтённых строк: номер следующей строки для новых ячеек
+        self.rows = 0
+        # категории в порядке первого появления: всех операций и только датированных расходов
+        self.categories = {}
+        self.expense_categories = {}
+        # операции с нулевой суммой: в отчётах по времени это доход, в итогах — ни доход, ни расход
+        self.zero_count = 0
+        # версия правил категоризации, по которым собран куб (если известна)
+        self.ruleset_version = None
+
+    def add(self, t):
+        info = decode_date(t["date"])
+        self._add(t["amount"], info.month_key if info else UNDATED, t.get("category", f'{lcl.NO_CATEGORY}'))
+
+    def update(self, transactions):
+        """Добавляет транзакции: список записей или словарей, поток или TransactionFrame"""
+        if isinstance(transactions, TransactionFrame):
+            labels = _category_labels(transactions)
+            add = self._add
+            for amount, month_code, code in zip(transactions.amounts, transactions.month_codes,
+                                                transactions.category_codes):
+                add(amount, UNDATED if month_code == NO_CODE else month_key(month_code), labels[code])
+            return self
+        add = self.add
+        for t in transactions:
+            add(t)
+        return self
+
+    def _add(self, amount: float, month: str, category: str):
+        self.categories[category] = None
+        if amount == 0:
+            self.zero_count += 1
+        data = self.cells.get(month)
+        if data is None:
+            data = self.cells[month] = {"income": {}, "expenses": {}}
+        if amount >= 0:
+            side = data["income"]
+        else:
+            side = data["expenses"]
+            if month != UNDATED:
+                self.expense_categories[category] = None
+        cell = side.get(category)
+        if cell is None:
+            cell = side[category] = [0, 0, self.rows]
+        cell[0] += amount
+        cell[1] += 1
+        self.rows += 1
+
+    # --- отчёты по ячейкам ---
+
+    def _periods(self, period_of) -> dict:
+        """Сливает месяцы в периоды: период -> {"income"/"expenses": {категория: [сумма, количество, первая строка]}}"""
+        periods = {}
+        for month, data in self.cells.items():
+            if month == UNDATED:
+                continue
+            merged = periods.setdefault(period_of(month), {"income": {}, "expenses": {}})
+            for side in ("income", "expenses"):
+                target = merged[side]
+                for category, (total, count, first) in data[side].items():
+                    cell = target.get(category)
+                    if cell is None:
+                        target[category] = [total, count, first]
+                        continue
+                    cell[0] += total
+                    cell[1] += count
+                    cell[2] = min(cell[2], first)
+        return periods
+
+    def _totals(self) -> dict:
+        # категория -> [сумма, количество] по всем месяцам
+        totals = {category: [0, 0] for category in self.categories}
+        for data in self.cells.values():
+            for side in ("income", "expenses"):
+                for category, (total, count, _) in data[side].items():
+                    totals[category][0] += total
+                    totals[category][1] += count
+        return totals
+
+    def basic_stats(self) -> dict:
+        total_income = total_expense = 0
+        count_income = count_expense = 0
+        for data in self.cells.values():
+            for total, count, _ in data["income"].values():
+                total_income += total
+                count_income += count
+            for total, count, _ in data["expenses"].values():
+                total_expense += total
+                count_expense += count
+        return {
+            "total_income": total_income,
+            "total_expense": total_expense,
+            "balance": total_income + total_expense,
+            "transaction_count": count_income + count_expense,
+            "income_transactions": count_income - self.zero_count,
+            "expense_transactions": count_expense
+        }
+
+    def by_category(self) -> dict:
+        total_expense = self.basic_stats()["total_expense"]
+        totals = {
+            cat: {"sum": s, "count": n, "percent": (-s / -total_expense * 100) if total_expense else 0}
+            for cat, (s, n) in self._totals().items()
+        }
+        return dict(sorted(totals.items(), key=lambda item: abs(item[1]["sum"]), reverse=True))
+
+    def _timeline(self, periods: dict) -> dict:
+        result = {}
+        for period, data in periods.items():
+            # категории в порядке первой строки, как в Counter по списку строк
+            expenses = sorted(data["expenses"].items(), key=lambda item: item[1][2])
+            counts = Counter({category: count for category, (_, count, _) in expenses})
+            result[period] = {
+                "income": sum(total for total, _, _ in data["income"].values()),
+                "expenses": sum(total for total, _, _ in data["expenses"].values()),
+                "categories": list(counts.elements()),
+                "top_categories": counts.most_common(3)
+            }
+        return result
+
+    def by_time(self) -> dict:
+        """Отчёт по месяцам в форме analyze_by_time"""
+        return self._timeline(self._periods(lambda month: month))
+
+    def by_quarter(self) -> dict:
+        """Отчёт по кварталам в форме analyze_seasonal_trends"""
+        return self._timeline(self._periods(quarter_of))
+
+    def by_year(self) -> dict:
+        return self._timeline(self._periods(_year))
+
+    def historical_spending(self) -> dict:
+        monthly_spending = {category: [] for category in self.expense_categories}
+        for month, data in self.cells.items():
+            if month == UNDATED:
+                continue
+            for category, (total, _, _) in data["expenses"].items():
+                monthly_spending[category].append(-total)
+        avg_spending = {
+            cat: round(statistics.mean(vals), 2)
+            for cat, vals in monthly_spending.items() if vals
+        }
+        top_cats = sorted(avg_spending.items(), key=lambda x: x[1], reverse=True)[:3]
+        return {
+            "average_spending": avg_spending,
+            "top_categories": top_cats
+        }
+
+    def actual_spending(self, period: str = None) -> dict:
+        """Расходы по категориям; period — 'YYYY', 'YYYY-Qn' или 'YYYY-MM' ограничивает интервал"""
+        actual = {}
+        for month, data in self.cells.items():
+            if period is not None and (month == UNDATED or not in_period(month, period)):
+                continue
+            for category, (total, _, _) in data["expenses"].items():
+                actual[category] = actual.get(category, 0.0) - total
+        return actual
+
+    # --- сохранение ---
+
+    def to_dict(self) -> dict:
+        return {
+            "version": CUBE_VERSION,
+            "categories": list(self.categories),
+            "expense_categories": list(self.expense_categories),
+            "zero_count": self.zero_count,
+            "rows": self.rows,
+            "ruleset_version": self.ruleset_version,
+            "cells": self.cells
+        }
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "RollupCube":
+        if state.get("version") != CUBE_VERSION:
+            raise ValueError(f"unsupported rollup cube version: {state.get('version')!r}")
+        cube = cls()
+        cube.categories = dict.fromkeys(state["categories"])
+        cube.expense_categories = dict.fromkeys(state["expense_categories"])
+        cube.zero_count = state["zero_count"]
+        cube.rows = state["rows"]
+        cube.ruleset_version = state.get("ruleset_version")
+        cube.cells = {
+            month: {side: {category: list(cell) for category, cell in data[side].items()}
+                    for side in ("income", "expenses")}
+            for month, data in state["cells"].items()
+        }
+        return cube
+
+    def save(self, filename: str):
+        """Атомарно записывает куб в JSON-файл"""
+        tmp_name = f"{filename}.tmp"
+        with open(tmp_name, "w", encoding="utf-8") as file:
+            json.dump(self.to_dict(), file, ensure_ascii=False)
+        os.replace(tmp_name, filename)
+
+    @classmethod
+    def load(cls, filename: str) -> "RollupCube":
+        with open(filename, "r", encoding="utf-8") as file:
+            return cls.from_dict(json.load(file))
+
+
+def update_cube(filename: str, transactions) -> RollupCube:
+    """Дописывает новые транзакции в сохранённый куб и сохраняет его (создаёт, если файла нет)"""
+    if os.path.exists(filename):
+        cube = RollupCube.load(filename)
+    else:
+        cube = RollupCube()
+    cube.update(transactions)
+    cube.save(filename)
+    return cube
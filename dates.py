@@ -0,0 +1,75 @@
+import datetime
+from collections import namedtuple
+
+# ==========================
+# РАЗБОР ДАТ С КЭШЕМ
+# ==========================
+
+DateInfo = namedtuple("DateInfo", ["year", "month", "quarter", "ordinal", "month_key", "quarter_key"])
+
+MAX_CACHED_DATES = 100000
+
+_date_cache = {}
+_month_keys = {}
+
+
+def _parse(date: str):
+    # Быстрый путь для ISO 'YYYY-MM-DD' без strptime; остальное — как раньше через strptime
+    if len(date) == 10 and date[4] == "-" and date[7] == "-":
+        year, month, day = date[:4], date[5:7], date[8:]
+        if year.isdigit() and month.isdigit() and day.isdigit():
+            return datetime.date(int(year), int(month), int(day))
+    return datetime.datetime.strptime(date, "%Y-%m-%d").date()
+
+
+def decode_date(date: str):
+    """Возвращает DateInfo для строки 'YYYY-MM-DD' или None, если дата некорректна.
+
+    Каждая строка разбирается один раз: результат (и неудача) запоминаются.
+    """
+    try:
+        return _date_cache[date]
+    except KeyError:
+        pass
+    except TypeError:
+        return None
+    try:
+        d = _parse(date)
+        quarter = (d.month - 1) // 3 + 1
+        info = DateInfo(d.year, d.month, quarter, d.toordinal(),
+                        d.strftime("%Y-%m"), f"{d.year}-Q{quarter}")
+    except Exception:
+        info = None
+    if len(_date_cache) >= MAX_CACHED_DATES:
+        _date_cache.clear()
+    _date_cache[date] = info
+    return info
+
+
+def month_code(info: DateInfo) -> int:
+    return info.year * 12 + info.month - 1
+
+
+def month_key(code: int) -> str:
+    """Ключ месяца вида 'YYYY-MM' по коду year * 12 + month - 1"""
+    key = _month_keys.get(code)
+    if key is None:
+        year, month = divmod(code, 12)
+        key = datetime.date(year, month + 1, 1).strftime("%Y-%m")
+        _month_keys[code] = key
+    return key
+
+
+def month_key_code(key: str) -> int:
+    """Код year * 12 + month - 1 по ключу месяца 'YYYY-MM' (обратное к month_key)"""
+    return int(key[:4]) * 12 + int(key[5:7]) - 1
+
+
+def quarter_of(month: str) -> str:
+    """Ключ квартала 'YYYY-Qn' по ключу месяца 'YYYY-MM'"""
+    return f"{month[:4]}-Q{(int(month[5:7]) - 1) // 3 + 1}"
+
+
+def in_period(month: str, period) -> bool:
+    """Попадает ли месяц 'YYYY-MM' в период 'YYYY', 'YYYY-Qn' или 'YYYY-MM' (None — в любой)"""
+    return period is None or period in (month, quarter_of(month), month[:4])
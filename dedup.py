@@ -0,0 +1,163 @@
+import hashlib
+import os
+from array import array
+from bisect import bisect_left, bisect_right
+
+from dates import decode_date
+from frame import TransactionFrame, NO_CODE
+
+# ==========================
+# УДАЛЕНИЕ ДУБЛИКАТОВ МЕЖДУ ВЫГРУЗКАМИ
+# ==========================
+
+# от BLOOM_THRESHOLD ожидаемых строк поиск в индексе прежних источников предваряет фильтр Блума:
+# 16 бит и один хеш на строку — около 6% ложных «возможно есть», зато проверка дешевле поиска
+BLOOM_THRESHOLD = 1_000_000
+BLOOM_BITS_PER_ROW = 16
+BLOOM_HASHES = 1
+# средний размер строки выгрузки для оценки числа строк по размеру файлов
+AVERAGE_ROW_BYTES = 48
+
+
+class BloomFilter:
+    """Битовый массив с k хешами (двойное хеширование): «точно нет» или «возможно есть»"""
+
+    __slots__ = ("size", "hashes", "bits")
+
+    def __init__(self, capacity: int, bits_per_item: int = BLOOM_BITS_PER_ROW, hashes: int = BLOOM_HASHES):
+        self.size = max(8, capacity * bits_per_item)
+        self.hashes = hashes
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, digest: int):
+        # две половины 64-битного отпечатка дают k позиций
+        first, second = digest & 0xFFFFFFFF, (digest >> 32) | 1
+        size = self.size
+        if self.hashes == 1:
+            return (first % size,)
+        return [(first + i * second) % size for i in range(self.hashes)]
+
+    def add(self, digest: int):
+        bits = self.bits
+        for position in self._positions(digest):
+            bits[position >> 3] |= 1 << (position & 7)
+
+    def might_contain(self, digest: int) -> bool:
+        bits = self.bits
+        for position in self._positions(digest):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+
+def _digest(day, amount: float, description: str) -> int:
+    """64-битный отпечаток строки: дата — номер дня (или исходная строка), сумма — в копейках,
+    описание — без регистра и лишних пробелов"""
+    key = f"{day!r}\x1f{round(amount * 100)}\x1f{' '.join(description.casefold().split())}"
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class Deduplicator:
+    """Отбрасывает строки, повторяющие уже прочитанные выгрузки.
+
+    Отпечаток строки — 64-битный хеш нормализованных (дата, сумма, описание). Одинаковые строки
+    внутри одного источника (две одинаковые покупки за день) сохраняются: строка считается
+    дубликатом, если такой отпечаток уже встречался столько же раз в одном из прежних источников.
+    Отпечатки прежних источников лежат в отсортированном array('Q') (8 байт на строку),
+    самих строк дедупликатор не держит, поэтому работает на потоке пачек. Для больших выгрузок
+    (от BLOOM_THRESHOLD строк) поиск в индексе предваряет фильтр Блума; решение всё равно
+    принимается по индексу, поэтому ложные срабатывания фильтра строк не теряют.
+    """
+
+    def __init__(self, last_source=None, expected_rows: int = None):
+        self.bloom = None
+        if expected_rows is not None and expected_rows >= BLOOM_THRESHOLD:
+            self.bloom = BloomFilter(expected_rows)
+        # отпечатки завершённых источников по возрастанию; отпечаток повторяется столько раз,
+        # сколько он встречался в одном источнике (наибольшее по источникам)
+        self.seen = array("Q")
+        # текущий источник: новые отпечатки — списком, уже известные — со счётчиком
+        self.fresh = array("Q")
+        self.current = {}
+        self.source = None
+        # отпечатки последнего источника сравнивать уже не с кем: они не запоминаются
+        self.last_source = last_source
+        self.final = False
+        self.dropped = 0
+
+    @classmethod
+    def for_paths(cls, paths: list) -> "Deduplicator":
+        """Последний путь — последний источник; режим с фильтром Блума — по суммарному размеру файлов"""
+        size = sum(os.path.getsize(path) for path in paths if os.path.exists(path))
+        return cls(paths[-1] if paths else None, size // AVERAGE_ROW_BYTES)
+
+    def _seen_count(self, digest: int) -> int:
+        seen = self.seen
+        index = bisect_left(seen, digest)
+        if index == len(seen) or seen[index] != digest:
+            return 0
+        return bisect_right(seen, digest, index) - index
+
+    def start_source(self, source):
+        """Переход к следующему источнику: отпечатки текущего становятся «прежними»"""
+        if source == self.source:
+            return
+        additions = self.fresh
+        for digest, count in self.current.items():
+            extra = count - self._seen_count(digest)
+            if extra > 0:
+                additions.extend([digest] * extra)
+        if additions:
+            if self.bloom is not None:
+                for digest in additions:
+                    self.bloom.add(digest)
+            self.seen = array("Q", sorted(self.seen + additions))
+        self.fresh = array("Q")
+        self.current = {}
+        self.source = source
+        self.final = source == self.last_source and source is not None
+
+    def is_duplicate(self, day, amount: float, description: str) -> bool:
+        digest = _digest(day, amount, description)
+        bloom = self.bloom
+        limit = 0 if bloom is not None and not bloom.might_contain(digest) else self._seen_count(digest)
+        if not limit:
+            if not self.final:
+                self.fresh.append(digest)
+            return False
+        count = self.current.get(digest, 0) + 1
+        self.current[digest] = count
+        if count <= limit:
+            self.dropped += 1
+            return True
+        return False
+
+    def filter(self, transactions, source) -> list:
+        """Строки источника source без повторов прежних источников (пачка или поток)"""
+        self.start_source(source)
+        kept = []
+        for t in transactions:
+            info = decode_date(t["date"])
+            day = info.ordinal if info is not None else t["date"]
+            if not self.is_duplicate(day, t["amount"], t.get("description", "")):
+                kept.append(t)
+        return kept
+
+    def filter_frame(self, frame: TransactionFrame, source) -> TransactionFrame:
+        self.start_source(source)
+        keep = [
+            index for index, (day, date, amount, description) in enumerate(
+                zip(frame.day_codes, frame.dates, frame.amounts, frame.descriptions))
+            if not self.is_duplicate(date if day == NO_CODE else day, amount, description)
+        ]
+        if len(keep) == len(frame):
+            return frame
+        return TransactionFrame.from_columns(
+            [frame.dates[i] for i in keep],
+            [frame.descriptions[i] for i in keep],
+            array("d", (frame.amounts[i] for i in keep)),
+            array("l", (frame.day_codes[i] for i in keep)),
+            array("l", (frame.month_codes[i] for i in keep)),
+            array("b", (frame.type_codes[i] for i in keep)),
+            array("h", (frame.category_codes[i] for i in keep)),
+            frame.category_names)
@@ -0,0 +1,294 @@
+import json
+import math
+import os
+import statistics
+from collections import Counter
+
+import local as lcl
+from dates import decode_date, month_key, quarter_of
+from frame import TransactionFrame, NO_CODE, _category_labels
+from transaction import Transaction, CATEGORY_NAMES
+from sketch import SpendingSketches
+
+# ==========================
+# ОДНОПРОХОДНЫЙ АГРЕГАТОР
+# ==========================
+
+STATE_VERSION = 2
+
+
+class CompensatedSum:
+    """Сумма, которая растёт по одному слагаемому и совпадает со встроенным sum() по тем же числам.
+
+    На Python 3.12+ sum() складывает float с компенсацией Ноймайера; итоги из списка транзакций
+    считаются через sum(), поэтому агрегатор повторяет тот же алгоритм.
+    """
+
+    __slots__ = ("total", "compensation")
+
+    def __init__(self, total=0, compensation: float = 0.0):
+        # пустая сумма, как и у sum(), — int 0
+        self.total = total
+        self.compensation = compensation
+
+    def add(self, value: float):
+        total = self.total
+        result = total + value
+        if abs(total) >= abs(value):
+            self.compensation += (total - result) + value
+        else:
+            self.compensation += (value - result) + total
+        self.total = result
+
+    @property
+    def value(self):
+        compensation = self.compensation
+        if compensation and math.isfinite(compensation):
+            return self.total + compensation
+        return self.total
+
+
+class Aggregator:
+    """Собирает за один проход всё, что нужно отчёту: итоги, категории, месяцы, средние траты и факт по бюджету"""
+
+    def __init__(self, sketches: SpendingSketches = None):
+        self.income_sum = CompensatedSum()
+        self.expense_sum = CompensatedSum()
+        self.transaction_count = 0
+        self.income_count = 0
+        self.expense_count = 0
+        # категория -> [сумма, количество]
+        self.categories = {}
+        # месяц 'YYYY-MM' -> {"income", "expenses", "categories": Counter}
+        self.months = {}
+        # квартал 'YYYY-Qn' -> то же, что для месяца
+        self.quarters = {}
+        # категория -> {месяц: сумма расходов}
+        self.monthly_spending = {}
+        # категория -> сумма расходов (для сравнения с бюджетом)
+        self.actual = {}
+        # необязательные квантильные скетчи расходов по категориям и месяцам
+        self.sketches = sketches
+
+    def add(self, t):
+        if type(t) is Transaction:
+            info = decode_date(t.date)
+            code = t.category_code
+            category = f'{lcl.NO_CATEGORY}' if code == NO_CODE else CATEGORY_NAMES[code]
+            if info is None:
+                self._add(t.amount, None, None, category)
+            else:
+                self._add(t.amount, info.month_key, info.quarter_key, category)
+            return
+        info = decode_date(t["date"])
+        category = t.get("category", f'{lcl.NO_CATEGORY}')
+        if info is None:
+            self._add(t["amount"], None, None, category)
+        else:
+            self._add(t["amount"], info.month_key, info.quarter_key, category)
+
+    def update(self, transactions):
+        """Добавляет пачку транзакций: список записей или словарей, любой итерируемый поток или TransactionFrame"""
+        if isinstance(transactions, TransactionFrame):
+            labels = _category_labels(transactions)
+            add = self._add
+            # (месяц, квартал) по коду месяца; без даты — (None, None)
+            periods = {NO_CODE: (None, None)}
+            for amount, month_code, code in zip(transactions.amounts, transactions.month_codes,
+                                                transactions.category_codes):
+                keys = periods.get(month_code)
+                if keys is None:
+                    month = month_key(month_code)
+                    keys = periods[month_code] = (month, quarter_of(month))
+                add(amount, *keys, labels[code])
+            return self
+        add = self.add
+        for t in transactions:
+            add(t)
+        return self
+
+    def _add(self, amount: float, month, quarter, category: str):
+        self.transaction_count += 1
+        if amount > 0:
+            self.income_sum.add(amount)
+            self.income_count += 1
+        elif amount < 0:
+            self.expense_sum.add(amount)
+            self.expense_count += 1
+
+        totals = self.categories.get(category)
+        if totals is None:
+            totals = self.categories[category] = [0, 0]
+        totals[0] += amount
+        totals[1] += 1
+
+        if amount < 0:
+            self.actual[category] = self.actual.get(category, 0.0) + abs(amount)
+
+        if month is None:
+            return
+        data = self.months.get(month)
+        if data is None:
+            data = self.months[month] = {"income": 0, "expenses": 0, "categories": Counter()}
+        period = self.quarters.get(quarter)
+        if period is None:
+            period = self.quarters[quarter] = {"income": 0, "expenses": 0, "categories": Counter()}
+        if amount >= 0:
+            data["income"] += amount
+            period["income"] += amount
+        else:
+            data["expenses"] += amount
+            data["categories"][category] += 1
+            period["expenses"] += amount
+            period["categories"][category] += 1
+            spending = self.monthly_spending.setdefault(category, {})
+            spending[month] = spending.get(month, 0.0) + abs(amount)
+            if self.sketches is not None:
+                self.sketches.add(category, month, amount)
+
+    # --- результаты в форме функций из main.py ---
+
+    @property
+    def total_income(self):
+        return self.income_sum.value
+
+    @property
+    def total_expense(self):
+        return self.expense_sum.value
+
+    def basic_stats(self) -> dict:
+        total_income = self.total_income
+        total_expense = self.total_expense
+        return {
+            "total_income": total_income,
+            "total_expense": total_expense,
+            "balance": total_income + total_expense,
+            "transaction_count": self.transaction_count,
+            "income_transactions": self.income_count,
+            "expense_transactions": self.expense_count
+        }
+
+    def by_category(self) -> dict:
+        total_expense = self.total_expense
+        totals = {
+            cat: {"sum": s, "count": n, "percent": (-s / -total_expense * 100) if total_expense else 0}
+            for cat, (s, n) in self.categories.items()
+        }
+        return dict(sorted(totals.items(), key=lambda item: abs(item[1]["sum"]), reverse=True))
+
+    @staticmethod
+    def _timeline(periods: dict) -> dict:
+        # список categories восстанавливается из счётчика: те же элементы, сгруппированные по категориям
+        return {
+            period: {
+                "income": data["income"],
+                "expenses": data["expenses"],
+                "categories": list(data["categories"].elements()),
+                "top_categories": data["categories"].most_common(3)
+            }
+            for period, data in periods.items()
+        }
+
+    def by_time(self) -> dict:
+        return self._timeline(self.months)
+
+    def by_quarter(self) -> dict:
+        """Отчёт по кварталам в форме analyze_seasonal_trends"""
+        return self._timeline(self.quarters)
+
+    def historical_spending(self) -> dict:
+        avg_spending = {
+            cat: round(statistics.mean(vals.values()), 2)
+            for cat, vals in self.monthly_spending.items() if vals
+        }
+        top_cats = sorted(avg_spending.items(), key=lambda x: x[1], reverse=True)[:3]
+        return {
+            "average_spending": avg_spending,
+            "top_categories": top_cats
+        }
+
+    def actual_spending(self) -> dict:
+        return dict(self.actual)
+
+    # --- сохранение состояния между запусками ---
+
+    def to_dict(self) -> dict:
+        state = {
+            "version": STATE_VERSION,
+            "income_sum": [self.income_sum.total, self.income_sum.compensation],
+            "expense_sum": [self.expense_sum.total, self.expense_sum.compensation],
+            "transaction_count": self.transaction_count,
+            "income_count": self.income_count,
+            "expense_count": self.expense_count,
+            "categories": self.categories,
+            "months": _periods_state(self.months),
+            "quarters": _periods_state(self.quarters),
+            "monthly_spending": self.monthly_spending,
+            "actual": self.actual
+        }
+        if self.sketches is not None:
+            state["sketches"] = self.sketches.to_dict()
+        return state
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "Aggregator":
+        if state.get("version") != STATE_VERSION:
+            raise ValueError(f"unsupported aggregate state version: {state.get('version')!r}")
+        aggregator = cls()
+        aggregator.income_sum = CompensatedSum(*state["income_sum"])
+        aggregator.expense_sum = CompensatedSum(*state["expense_sum"])
+        aggregator.transaction_count = state["transaction_count"]
+        aggregator.income_count = state["income_count"]
+        aggregator.expense_count = state["expense_count"]
+        aggregator.categories = {cat: list(totals) for cat, totals in state["categories"].items()}
+        aggregator.months = _periods_from_state(state["months"])
+        aggregator.quarters = _periods_from_state(state["quarters"])
+        aggregator.monthly_spending = {cat: dict(months) for cat, months in state["monthly_spending"].items()}
+        aggregator.actual = dict(state["actual"])
+        if "sketches" in state:
+            aggregator.sketches = SpendingSketches.from_dict(state["sketches"])
+        return aggregator
+
+    def save(self, filename: str):
+        """Атомарно записывает состояние в JSON-файл"""
+        tmp_name = f"{filename}.tmp"
+        with open(tmp_name, "w", encoding="utf-8") as file:
+            json.dump(self.to_dict(), file, ensure_ascii=False)
+        os.replace(tmp_name, filename)
+
+    @classmethod
+    def load(cls, filename: str) -> "Aggregator":
+        with open(filename, "r", encoding="utf-8") as file:
+            return cls.from_dict(json.load(file))
+
+
+def _periods_state(periods: dict) -> dict:
+    return {
+        period: {"income": data["income"], "expenses": data["expenses"], "categories": dict(data["categories"])}
+        for period, data in periods.items()
+    }
+
+
+def _periods_from_state(state: dict) -> dict:
+    return {
+        period: {"income": data["income"], "expenses": data["expenses"], "categories": Counter(data["categories"])}
+        for period, data in state.items()
+    }
+
+
+def aggregate(transactions) -> Aggregator:
+    return Aggregator().update(transactions)
+
+
+def update_aggregate_state(filename: str, transactions) -> Aggregator:
+    """Дописывает новые транзакции в сохранённое состояние за O(размер пачки) и сохраняет его.
+
+    История заново не читается: если файла состояния ещё нет, он создаётся.
+    """
+    if os.path.exists(filename):
+        aggregator = Aggregator.load(filename)
+    else:
+        aggregator = Aggregator()
+    aggregator.update(transactions)
+    aggregator.save(filename)
+    return aggregator
@@ -0,0 +1,240 @@
+import statistics
+from array import array
+from collections import Counter
+
+import local as lcl
+from dates import decode_date, month_code, month_key
+
+# ==========================
+# КОЛОНОЧНОЕ ХРАНЕНИЕ ТРАНЗАКЦИЙ
+# ==========================
+
+TYPE_LABELS = (f'{lcl.INCOME_LABEL}', f'{lcl.EXPENSE_LABEL}')
+INCOME_CODE = 0
+EXPENSE_CODE = 1
+NO_CODE = -1
+
+def decode_date_codes(date: str) -> tuple:
+    """Возвращает (номер дня, код месяца) или (NO_CODE, NO_CODE) для некорректной даты"""
+    info = decode_date(date)
+    if info is None:
+        return NO_CODE, NO_CODE
+    return info.ordinal, month_code(info)
+
+
+class TransactionFrame:
+    """Транзакции по колонкам: суммы в array('d'), даты и категории — целочисленными кодами"""
+
+    def __init__(self):
+        self.dates = []
+        self.descriptions = []
+        self.amounts = array("d")
+        self.day_codes = array("l")
+        self.month_codes = array("l")
+        self.type_codes = array("b")
+        self.category_codes = array("h")
+        self.category_names = []
+        self._category_index = {}
+
+    @classmethod
+    def from_records(cls, records) -> "TransactionFrame":
+        """Строит таблицу из кортежей (дата, сумма, описание)"""
+        frame = cls()
+        append = frame.append
+        for date, amount, description in records:
+            append(date, amount, description)
+        return frame
+
+    @classmethod
+    def from_rows(cls, rows) -> "TransactionFrame":
+        """Строит таблицу из словарей-транзакций"""
+        frame = cls()
+        for row in rows:
+            frame.append(row["date"], row["amount"], row.get("description", ""), row.get("category"))
+        return frame
+
+    @classmethod
+    def from_columns(cls, dates, descriptions, amounts, day_codes, month_codes, type_codes,
+                     category_codes, category_names) -> "TransactionFrame":
+        """Собирает таблицу из готовых колонок (например, загруженных из снимка)"""
+        frame = cls()
+        frame.dates = dates
+        frame.descriptions = descriptions
+        frame.amounts = amounts
+        frame.day_codes = day_codes
+        frame.month_codes = month_codes
+        frame.type_codes = type_codes
+        frame.category_codes = category_codes
+        for name in category_names:
+            frame.category_code(name)
+        return frame
+
+    def append(self, date: str, amount: float, description: str, category: str = None):
+        day_code, month_code = decode_date_codes(date)
+        self.dates.append(date)
+        self.descriptions.append(description)
+        self.amounts.append(amount)
+        self.day_codes.append(day_code)
+        self.month_codes.append(month_code)
+        self.type_codes.append(INCOME_CODE if amount >= 0 else EXPENSE_CODE)
+        self.category_codes.append(NO_CODE if category is None else self.category_code(category))
+
+    def extend(self, other: "TransactionFrame"):
+        """Дописывает в конец строки другой таблицы, перекодируя категории"""
+        remap = array("h", (self.category_code(name) for name in other.category_names))
+        self.dates.extend(other.dates)
+        self.descriptions.extend(other.descriptions)
+        self.amounts.extend(other.amounts)
+        self.day_codes.extend(other.day_codes)
+        self.month_codes.extend(other.month_codes)
+        self.type_codes.extend(other.type_codes)
+        self.category_codes.extend(NO_CODE if code == NO_CODE else remap[code] for code in other.category_codes)
+
+    def category_code(self, name: str) -> int:
+        code = self._category_index.get(name)
+        if code is None:
+            code = len(self.category_names)
+            self.category_names.append(name)
+            self._category_index[name] = code
+        return code
+
+    def set_categories(self, categories):
+        """Заменяет колонку категорий списком названий (по одному на строку)"""
+        code_of = self.category_code
+        self.category_codes = array("h", (code_of(name) for name in categories))
+
+    def __len__(self):
+        return len(self.amounts)
+
+    def __getitem__(self, index: int) -> dict:
+        row = {
+            "date": self.dates[index],
+            "amount": self.amounts[index],
+            "description": self.descriptions[index],
+            "type": TYPE_LABELS[self.type_codes[index]],
+        }
+        code = self.category_codes[index]
+        if code != NO_CODE:
+            row["category"] = self.category_names[code]
+        return row
+
+    def __iter__(self):
+        # Представление в виде словарей для совместимости; изменения в них не попадают в таблицу
+        for index in range(len(self)):
+            yield self[index]
+
+    def rows(self) -> list:
+        return list(self)
+
+
+# ==========================
+# АНАЛИТИКА ПО КОЛОНКАМ
+# ==========================
+
+def _category_labels(frame: TransactionFrame) -> list:
+    return frame.category_names + [f'{lcl.NO_CATEGORY}']
+
+
+def basic_stats(frame: TransactionFrame) -> dict:
+    # итоги — встроенным sum(), как в calculate_basic_stats (на Python 3.12+ он с компенсацией)
+    income = [amount for amount in frame.amounts if amount > 0]
+    expense = [amount for amount in frame.amounts if amount < 0]
+    total_income = sum(income)
+    total_expense = sum(expense)
+    return {
+        "total_income": total_income,
+        "total_expense": total_expense,
+        "balance": total_income + total_expense,
+        "transaction_count": len(frame),
+        "income_transactions": len(income),
+        "expense_transactions": len(expense)
+    }
+
+
+def by_category(frame: TransactionFrame) -> dict:
+    labels = _category_labels(frame)
+    sums = [0] * len(labels)
+    counts = [0] * len(labels)
+    order = []
+    total_expense = sum(amount for amount in frame.amounts if amount < 0)
+    for amount, code in zip(frame.amounts, frame.category_codes):
+        if not counts[code]:
+            order.append(code)
+        sums[code] += amount
+        counts[code] += 1
+    totals = {}
+    for code in order:
+        percent = (-sums[code] / -total_expense * 100) if total_expense else 0
+        totals[labels[code]] = {"sum": sums[code], "count": counts[code], "percent": percent}
+    return dict(sorted(totals.items(), key=lambda item: abs(item[1]["sum"]), reverse=True))
+
+
+def by_month(frame: TransactionFrame) -> dict:
+    labels = _category_labels(frame)
+    monthly = {}
+    for amount, month_index, code in zip(frame.amounts, frame.month_codes, frame.category_codes):
+        if month_index == NO_CODE:
+            continue
+        data = monthly.get(month_index)
+        if data is None:
+            data = monthly[month_index] = {"income": 0, "expenses": 0, "categories": []}
+        if amount >= 0:
+            data["income"] += amount
+        else:
+            data["expenses"] += amount
+            data["categories"].append(labels[code])
+    result = {}
+    for month_index, data in monthly.items():
+        data["top_categories"] = Counter(data["categories"]).most_common(3)
+        result[month_key(month_index)] = data
+    return result
+
+
+def by_quarter(frame: TransactionFrame) -> dict:
+    labels = _category_labels(frame)
+    quarterly = {}
+    for amount, month_index, code in zip(frame.amounts, frame.month_codes, frame.category_codes):
+        if month_index == NO_CODE:
+            continue
+        year, month = divmod(month_index, 12)
+        key = f"{year}-Q{month // 3 + 1}"
+        data = quarterly.get(key)
+        if data is None:
+            data = quarterly[key] = {"income": 0, "expenses": 0, "categories": []}
+        if amount >= 0:
+            data["income"] += amount
+        else:
+            data["expenses"] += amount
+            data["categories"].append(labels[code])
+    for data in quarterly.values():
+        data["top_categories"] = Counter(data["categories"]).most_common(3)
+    return quarterly
+
+
+def historical_spending(frame: TransactionFrame) -> dict:
+    labels = _category_labels(frame)
+    monthly_spending = {}
+    for amount, month_index, code in zip(frame.amounts, frame.month_codes, frame.category_codes):
+        if amount < 0 and month_index != NO_CODE:
+            months = monthly_spending.setdefault(code, {})
+            months[month_index] = months.get(month_index, 0.0) + abs(amount)
+    avg_spending = {
+        labels[code]: round(statistics.mean(months.values()), 2)
+        for code, months in monthly_spending.items() if months
+    }
+    top_cats = sorted(avg_spending.items(), key=lambda x: x[1], reverse=True)[:3]
+    return {
+        "average_spending": avg_spending,
+        "top_categories": top_cats
+    }
+
+
+def actual_by_category(frame: TransactionFrame) -> dict:
+    labels = frame.category_names
+    actual = {}
+    for amount, code in zip(frame.amounts, frame.category_codes):
+        if amount < 0:
+            if code == NO_CODE:
+                raise KeyError("category")
+            actual[labels[code]] = actual.get(labels[code], 0.0) + abs(amount)
+    return actual
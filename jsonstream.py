@@ -0,0 +1,128 @@
+import json
+import os
+
+# ==========================
+# ПОТОКОВОЕ ЧТЕНИЕ JSON И JSON LINES
+# ==========================
+
+CHUNK_SIZE = 1 << 16
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+# число, обрезанное после "." или "e"/"e-", разбирается как более короткое и оставляет до двух
+# символов хвоста; значение так близко к концу окна перечитывается после подчитки
+_NUMBER_TAIL = 2
+
+
+class _Buffer:
+    """Скользящее окно по текстовому файлу: подчитывает куски по мере разбора"""
+
+    def __init__(self, file, chunk_size: int):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.file.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        # уже разобранное начало окна отбрасывается, чтобы память не росла с размером файла
+        self.text = self.text[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        while True:
+            text = self.text
+            pos = self.pos
+            while pos < len(text) and text[pos] in _WHITESPACE:
+                pos += 1
+            self.pos = pos
+            if pos < len(text):
+                return text[pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, char: str):
+        found = self.peek()
+        if found != char:
+            raise json.JSONDecodeError(f"Expecting '{char}'", self.text, self.pos)
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                obj, end = _decoder.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                # значение обрезано границей куска — дочитываем и пробуем снова
+                if self.fill():
+                    continue
+                raise
+            # число у самого конца окна могло продолжаться в следующем куске
+            if len(self.text) - end <= _NUMBER_TAIL and self.fill():
+                continue
+            self.pos = end
+            return obj
+
+
+def iter_json_array(file, key: str = "transactions", chunk_size: int = CHUNK_SIZE):
+    """Выдаёт элементы массива по ключу key верхнеуровневого объекта по мере их разбора"""
+    buf = _Buffer(file, chunk_size)
+    buf.expect("{")
+    if buf.peek() == "}":
+        return
+    while True:
+        name = buf.value()
+        buf.expect(":")
+        if name == key and buf.peek() == "[":
+            buf.expect("[")
+            if buf.peek() != "]":
+                while True:
+                    yield buf.value()
+                    if buf.peek() == "]":
+                        break
+                    buf.expect(",")
+            buf.expect("]")
+        else:
+            value = buf.value()
+            if name == key and isinstance(value, list):
+                yield from value
+        if buf.peek() == "}":
+            return
+        buf.expect(",")
+
+
+def iter_jsonl(filename: str, start: int = 0, end: int = None):
+    """Выдаёт объекты из строк JSON Lines в диапазоне байтов [start, end)"""
+    with open(filename, "rb") as file:
+        file.seek(start)
+        pos = start
+        for line in file:
+            if end is not None and pos >= end:
+                break
+            pos += len(line)
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def split_jsonl(filename: str, parts: int) -> list:
+    """Делит файл JSON Lines на диапазоны байтов по границам строк для параллельного чтения"""
+    size = os.path.getsize(filename)
+    parts = max(1, parts)
+    bounds = [0]
+    with open(filename, "rb") as file:
+        for index in range(1, parts):
+            file.seek(max(bounds[-1], size * index // parts))
+            if file.tell() > 0:
+                file.seek(file.tell() - 1)
+                file.readline()
+            bounds.append(min(file.tell(), size))
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if start < end]
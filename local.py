@@ -173,6 +173,7 @@ CATEGORY = '''Категория'''
 AMOUNT_RUB = '''Сумма, руб.'''
 SMART_PIGGY_BANK = '''УМНАЯ КОПИЛКА — личный финансовый помощник'''
 NO_ANALYSIS_DATA = '''Нет данных для анализа.'''
+DUPLICATES_DROPPED = '''Пропущено повторяющихся операций:'''
 FINANCIAL_REPORT = '''ФИНАНСОВЫЙ ОТЧЁТ'''
 INCOME = '''Доходы:'''
 EXPENSES = '''Расходы:'''
@@ -2,10 +2,29 @@ import statistics
 import csv
 import json
 import os.path
-from collections import defaultdict, Counter
-import datetime
-import matplotlib.pyplot as plt
+from collections import defaultdict, Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+import glob
+import itertools
+import queue
+import threading
 import local as lcl
+from ruleset import CategoryRuleset, categorize_parallel
+import frame as frame_analytics
+from frame import TransactionFrame
+from transaction import Transaction
+from engine import Aggregator, aggregate
+from cube import RollupCube, cube_path
+from store import TransactionStore
+from rolling import WINDOWS, BUDGET_WINDOW, rolling_spending
+from sketch import QUANTILES, SpendingSketches
+from dedup import Deduplicator
+from report import build_report, write_report, save_report, report_file_format
+from jsonstream import iter_json_array, iter_jsonl
+from dates import decode_date
+from snapshot import CACHE_DIR, load_snapshot
+from mmapcsv import iter_csv_blocks
+from metrics import PipelineMetrics
 
 # ==========================
 # КАТЕГОРИИ И ПРИОРИТЕТЫ
@@ -75,88 +94,419 @@ def priority_categories() -> list:
 # ИМПОРТ ДАННЫХ
 # ==========================
 
-def read_csv_file(filename: str) -> list:
-    data = []
-    try:
-        with open(filename, 'r', encoding='utf-8') as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                amount = float(row.get('amount', 0))
-                transaction = {
-                    'date': row.get('date', '').strip(),
-                    'amount': amount,
-                    'description': row.get('description', '').strip(),
-                    'type': f'{lcl.INCOME_LABEL}' if amount >= 0 else f'{lcl.EXPENSE_LABEL}'
-                }
-                data.append(transaction)
-    except FileNotFoundError:
-        print(f'⚠️ {lcl.FILE} {filename} {lcl.NOT_FOUND}')
-    return data
+STREAM_BATCH_SIZE = 10000
+IMPORT_WORKERS = 8
+IMPORT_QUEUE_BATCHES = 2
+CSV_BACKEND = "mmap"
+CSV_COLUMNS = ('date', 'amount', 'description')
 
 
-def read_json_file(filename: str) -> list:
-    data = []
+def make_transaction(date: str, amount: float, description: str) -> Transaction:
+    # тип (доход/расход) вычисляется из суммы и хранится кодом
+    return Transaction(date, amount, description)
+
+
+def iter_csv_records(filename: str, backend: str = None):
+    """Построчно выдаёт кортежи (дата, сумма, описание) из CSV-файла.
+
+    backend: "mmap" — разбор байтов отображённого в память файла, "csv" — csv.DictReader;
+    по умолчанию берётся CSV_BACKEND.
+    """
+    if (backend or CSV_BACKEND) == "mmap":
+        for rows in iter_csv_blocks(filename, CSV_COLUMNS, ('', 0, '')):
+            for date, amount, description in rows:
+                yield date.strip(), float(amount), description.strip()
+        return
+    with open(filename, 'r', encoding='utf-8') as file:
+        reader = csv.DictReader(file)
+        for row in reader:
+            yield row.get('date', '').strip(), float(row.get('amount', 0)), row.get('description', '').strip()
+
+
+def _json_record(item: dict) -> tuple:
+    return item.get('date', '').strip(), float(item.get('amount', 0)), item.get('description', '').strip()
+
+
+def iter_json_records(filename: str):
+    """Выдаёт кортежи (дата, сумма, описание) из JSON-файла с ключом transactions по мере разбора"""
+    with open(filename, 'r', encoding='utf-8') as file:
+        for item in iter_json_array(file, 'transactions'):
+            yield _json_record(item)
+
+
+def iter_jsonl_records(filename: str, start: int = 0, end: int = None):
+    """Выдаёт кортежи из файла JSON Lines (одна транзакция на строку), можно по диапазону байтов"""
+    for item in iter_jsonl(filename, start, end):
+        yield _json_record(item)
+
+
+def _open_records(filename: str):
+    ext = os.path.splitext(filename)[1].lower()
+    if ext == ".csv":
+        return iter_csv_records(filename)
+    elif ext == ".json":
+        return iter_json_records(filename)
+    elif ext == ".jsonl":
+        return iter_jsonl_records(filename)
+    return None
+
+
+def _guard_records(records, filename: str):
+    """Пропускает записи источника, сообщая об отсутствующем файле или битом JSON"""
     try:
-        with open(filename, 'r', encoding='utf-8') as file:
-            json_data = json.load(file)
-            for item in json_data.get('transactions', []):
-                amount = float(item.get('amount', 0))
-                data.append({
-                    'date': item.get('date', '').strip(),
-                    'amount': amount,
-                    'description': item.get('description', '').strip(),
-                    'type': f'{lcl.INCOME_LABEL}' if amount >= 0 else f'{lcl.EXPENSE_LABEL}'
-                })
+        yield from records
     except FileNotFoundError:
         print(f'⚠️ {lcl.FILE} {filename} {lcl.NOT_FOUND}')
     except json.JSONDecodeError:
         print(f'⚠️ {lcl.JSON_FORMAT_ERROR} {filename}.')
+
+
+def _record_sink(as_frame: bool):
+    if as_frame:
+        frame = TransactionFrame()
+        return frame, lambda record: frame.append(*record)
+    data = []
+    return data, lambda record: data.append(make_transaction(*record))
+
+
+def _collect(records, filename: str, as_frame: bool):
+    data, store = _record_sink(as_frame)
+    for record in _guard_records(records, filename):
+        store(record)
     return data
 
 
-def import_financial_data(filename: str) -> list:
+def read_csv_file(filename: str, as_frame: bool = False):
+    return _collect(iter_csv_records(filename), filename, as_frame)
+
+
+def read_json_file(filename: str, as_frame: bool = False):
+    return _collect(iter_json_records(filename), filename, as_frame)
+
+
+def read_jsonl_file(filename: str, as_frame: bool = False):
+    return _collect(iter_jsonl_records(filename), filename, as_frame)
+
+
+def _batched(items, batch_size: int):
+    iterator = iter(items)
+    while True:
+        batch = list(itertools.islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def iter_financial_data(filename: str, batch_size: int = None):
+    """Лениво выдаёт транзакции файла по одной или списками по batch_size, не держа весь файл в памяти"""
     if not os.path.exists(filename):
-        return []
-    ext = os.path.splitext(filename)[1].lower()
-    if ext == ".csv":
-        return read_csv_file(filename)
-    elif ext == ".json":
-        return read_json_file(filename)
-    return []
+        return
+    records = _open_records(filename)
+    if records is None:
+        return
+    transactions = (make_transaction(*record) for record in _guard_records(records, filename))
+    if batch_size:
+        yield from _batched(transactions, batch_size)
+    else:
+        yield from transactions
+
+
+def expand_paths(paths) -> list:
+    """Раскрывает путь, шаблон glob или список из них в упорядоченный список файлов без повторов"""
+    if isinstance(paths, (str, os.PathLike)):
+        paths = [paths]
+    result = []
+    seen = set()
+    for path in paths:
+        if not isinstance(path, (str, os.PathLike)):
+            matches = expand_paths(path)
+        else:
+            path = os.fspath(path)
+            matches = sorted(glob.glob(path)) if glob.has_magic(path) else [path]
+        for match in matches:
+            if match not in seen:
+                seen.add(match)
+                result.append(match)
+    return result
+
+
+def iter_imported_files(paths: list, as_frame: bool = False, max_workers: int = IMPORT_WORKERS):
+    """Читает файлы в пуле потоков и выдаёт их транзакции в порядке путей.
+
+    Одновременно загружается не больше max_workers файлов.
+    """
+    return _iter_in_pool(lambda path: import_financial_data(path, as_frame), paths, max_workers)
+
+
+def _iter_in_pool(load, paths: list, max_workers: int):
+    # скользящее окно: в работе не больше max_workers файлов, результаты — в порядке путей
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque()
+        for path in paths:
+            pending.append(executor.submit(load, path))
+            if len(pending) >= max_workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def iter_imported_batches(paths: list, batch_size: int = STREAM_BATCH_SIZE, max_workers: int = IMPORT_WORKERS,
+                          with_paths: bool = False):
+    """Потоковое чтение многих файлов в пуле потоков: пачки выдаются в порядке путей.
+
+    Каждый файл читается в свою очередь не длиннее IMPORT_QUEUE_BATCHES пачек,
+    поэтому память ограничена max_workers * IMPORT_QUEUE_BATCHES пачками.
+    with_paths=True — выдавать пары (путь, пачка).
+    """
+    stop = threading.Event()
+    done = object()
+
+    def put(out, item) -> bool:
+        # после остановки потребителя очередь никто не читает: не ждём на ней вечно
+        while not stop.is_set():
+            try:
+                out.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce(path, out):
+        try:
+            for batch in iter_financial_data(path, batch_size):
+                if not put(out, batch):
+                    return
+            put(out, done)
+        except BaseException as error:
+            put(out, error)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        outputs = []
+        for path in paths:
+            out = queue.Queue(maxsize=IMPORT_QUEUE_BATCHES)
+            executor.submit(produce, path, out)
+            outputs.append(out)
+        try:
+            for path, out in zip(paths, outputs):
+                while True:
+                    item = out.get()
+                    if item is done:
+                        break
+                    if isinstance(item, BaseException):
+                        raise item
+                    yield (path, item) if with_paths else item
+        finally:
+            stop.set()
+            executor.shutdown(cancel_futures=True)
+
+
+def _is_multi_source(filename) -> bool:
+    if isinstance(filename, (str, os.PathLike)):
+        return glob.has_magic(os.fspath(filename))
+    return True
+
+
+def import_financial_data(filename, as_frame: bool = False, stream: bool = False, batch_size: int = None,
+                          max_workers: int = IMPORT_WORKERS):
+    """Импорт CSV/JSON/JSON Lines.
+
+    filename — путь, шаблон glob или список путей/шаблонов (файлы читаются параллельно);
+    as_frame=True — колоночная TransactionFrame вместо списка записей Transaction;
+    stream=True — генератор транзакций (или пачек по batch_size) вместо списка.
+    """
+    if _is_multi_source(filename):
+        paths = expand_paths(filename)
+        if stream:
+            batches = iter_imported_batches(paths, batch_size or STREAM_BATCH_SIZE, max_workers)
+            return batches if batch_size else itertools.chain.from_iterable(batches)
+        parts = iter_imported_files(paths, as_frame, max_workers)
+        if as_frame:
+            merged = TransactionFrame()
+            for part in parts:
+                merged.extend(part)
+            return merged
+        return list(itertools.chain.from_iterable(parts))
+    if stream:
+        return iter_financial_data(filename, batch_size)
+    if not os.path.exists(filename):
+        return TransactionFrame() if as_frame else []
+    records = _open_records(filename)
+    if records is None:
+        return TransactionFrame() if as_frame else []
+    return _collect(records, filename, as_frame)
 
 
 # ==========================
 # КАТЕГОРИЗАЦИЯ
 # ==========================
 
-def categorize_transaction_with_multiple(description: str, categories: dict, categories_priority: list) -> str:
-    description_low = description.lower()
-    matched_categories = []
+PARALLEL_CHUNK_SIZE = 50000
+
+_ruleset_cache = {}
+_default_ruleset = None
+
 
-    for category in categories_priority:
-        keywords = categories.get(category, [])
-        if any(keyword in description_low for keyword in keywords):
-            matched_categories.append(category)
+def default_ruleset() -> CategoryRuleset:
+    """Набор правил из all_categories() и priority_categories(), собирается один раз"""
+    global _default_ruleset
+    if _default_ruleset is None:
+        _default_ruleset = get_category_ruleset(all_categories(), priority_categories())
+    return _default_ruleset
 
 
-    if matched_categories:
-        return matched_categories[0]
-    return f'{lcl.OTHER}'
+def get_category_ruleset(categories: dict, categories_priority: list) -> CategoryRuleset:
+    """Возвращает скомпилированный набор правил для словаря категорий (строится один раз)"""
+    key = tuple((category, tuple(categories.get(category, []))) for category in categories_priority)
+    ruleset = _ruleset_cache.get(key)
+    if ruleset is None:
+        ruleset = CategoryRuleset(categories, categories_priority)
+        _ruleset_cache[key] = ruleset
+    return ruleset
 
 
-def categorize_all_transactions(transactions: list) -> list:
+def categorize_transaction_with_multiple(description: str, categories: dict = None,
+                                         categories_priority: list = None,
+                                         ruleset: CategoryRuleset = None) -> str:
+    if ruleset is None:
+        if categories is None or categories_priority is None:
+            ruleset = default_ruleset()
+        else:
+            ruleset = get_category_ruleset(categories, categories_priority)
+    return ruleset.categorize(description)
+
+
+def categorize_stream(transactions, ruleset: CategoryRuleset = None):
+    """Категоризирует поток транзакций (или пачек транзакций) по мере чтения"""
+    if ruleset is None:
+        ruleset = default_ruleset()
+    categorize = ruleset.categorize
+    for item in transactions:
+        if isinstance(item, list):
+            yield categorize_all_transactions(item, ruleset)
+            continue
+        item["category"] = categorize(item.get("description", ""))
+        yield item
+
+
+def categorize_all_transactions(transactions: list, ruleset: CategoryRuleset = None,
+                                workers: int = None, chunk_size: int = PARALLEL_CHUNK_SIZE) -> list:
+    """Проставляет категории; workers > 1 включает пул процессов с пачками по chunk_size описаний"""
+    if ruleset is None:
+        ruleset = default_ruleset()
+    if workers is not None and workers != 1:
+        if isinstance(transactions, TransactionFrame):
+            descriptions = transactions.descriptions
+        else:
+            descriptions = [t.get("description", "") for t in transactions]
+        categories = categorize_parallel(descriptions, ruleset, workers, chunk_size)
+        if isinstance(transactions, TransactionFrame):
+            transactions.set_categories(categories)
+        else:
+            for transaction, category in zip(transactions, categories):
+                transaction["category"] = category
+        return transactions
+    categorize = ruleset.categorize
+    if isinstance(transactions, TransactionFrame):
+        transactions.set_categories(categorize(desc) for desc in transactions.descriptions)
+        return transactions
     for transaction in transactions:
-        desc = transaction.get("description", "")
-        category = categorize_transaction_with_multiple(desc, all_categories(), priority_categories())
-        transaction["category"] = category
+        transaction["category"] = categorize(transaction.get("description", ""))
     return transactions
 
 
+def load_categorized_frame(filename: str, ruleset: CategoryRuleset = None,
+                           cache_dir: str = CACHE_DIR) -> TransactionFrame:
+    """Разобранные и категоризированные транзакции файла.
+
+    С cache_dir результат берётся из бинарного снимка, пока не изменились файл и набор правил.
+    """
+    if ruleset is None:
+        ruleset = default_ruleset()
+
+    def parse(name):
+        return categorize_all_transactions(import_financial_data(name, as_frame=True), ruleset)
+
+    if not cache_dir:
+        return parse(filename)
+    return load_snapshot(filename, ruleset.version, parse, cache_dir)
+
+
+async def aggregate_files_async(paths, ruleset: CategoryRuleset = None, batch_size: int = STREAM_BATCH_SIZE,
+                                workers: int = None) -> Aggregator:
+    """Агрегат по файлам (путь, шаблон glob или список) через асинхронный конвейер pipeline.py:
+    чтение, категоризация и агрегация пачек идут одновременно с ограниченными очередями.
+    """
+    # asyncio и конвейер нужны только этому режиму и не замедляют импорт main
+    from pipeline import run_pipeline
+    if ruleset is None:
+        ruleset = default_ruleset()
+    return await run_pipeline(expand_paths(paths), lambda path: iter_financial_data(path, batch_size),
+                              ruleset, workers=workers)
+
+
+def aggregate_files(paths, ruleset: CategoryRuleset = None, batch_size: int = STREAM_BATCH_SIZE,
+                    workers: int = None) -> Aggregator:
+    import asyncio
+    return asyncio.run(aggregate_files_async(paths, ruleset, batch_size, workers))
+
+
+def load_into_store(filename, store: TransactionStore, ruleset: CategoryRuleset = None,
+                    batch_size: int = STREAM_BATCH_SIZE) -> int:
+    """Потоково импортирует и категоризирует файлы (путь, шаблон или список) в SQLite-хранилище"""
+    if ruleset is None:
+        ruleset = default_ruleset()
+    count = 0
+    for batch in import_financial_data(filename, stream=True, batch_size=batch_size):
+        count += store.insert(categorize_all_transactions(batch, ruleset), batch_size)
+    return count
+
+
+def load_rollup_cube(filename: str, ruleset: CategoryRuleset = None, cache_dir: str = None) -> RollupCube:
+    """Куб категория × месяц для файла, сохранённый рядом с ним.
+
+    Пересобирается по строкам, только если файл данных новее куба или изменились правила;
+    новые транзакции можно дописывать в куб через update_cube(cube_path(filename), ...).
+    """
+    if ruleset is None:
+        ruleset = default_ruleset()
+    if not os.path.exists(filename):
+        return RollupCube()
+    path = cube_path(filename)
+    if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(filename):
+        try:
+            cube = RollupCube.load(path)
+        except (OSError, ValueError, KeyError):
+            cube = None
+        if cube is not None and cube.ruleset_version == ruleset.version:
+            return cube
+    cube = RollupCube().update(load_categorized_frame(filename, ruleset, cache_dir))
+    cube.ruleset_version = ruleset.version
+    cube.save(path)
+    return cube
+
+
 # ==========================
 # АНАЛИТИКА
 # ==========================
 
+# С numpy группировки по таблице от NUMPY_MIN_ROWS строк считаются векторно (vectorized.py);
+# numpy импортируется только при первой такой таблице, как matplotlib — при первом графике
+NUMPY_MIN_ROWS = 10000
+
+
+def _grouping(frame: TransactionFrame):
+    if len(frame) >= NUMPY_MIN_ROWS:
+        import vectorized
+        if vectorized.HAVE_NUMPY:
+            return vectorized
+    return frame_analytics
+
+
 def calculate_basic_stats(transactions: list) -> dict:
+    if isinstance(transactions, (Aggregator, RollupCube, TransactionStore)):
+        return transactions.basic_stats()
+    if isinstance(transactions, TransactionFrame):
+        return frame_analytics.basic_stats(transactions)
     total_income = sum(t["amount"] for t in transactions if t["amount"] > 0)
     total_expense = sum(t["amount"] for t in transactions if t["amount"] < 0)
     balance = total_income + total_expense
@@ -174,6 +524,10 @@ def calculate_basic_stats(transactions: list) -> dict:
 
 
 def calculate_by_category(transactions: list) -> dict:
+    if isinstance(transactions, (Aggregator, RollupCube, TransactionStore)):
+        return transactions.by_category()
+    if isinstance(transactions, TransactionFrame):
+        return _grouping(transactions).by_category(transactions)
     totals = defaultdict(lambda: {"sum": 0, "count": 0})
     total_expense = sum(t["amount"] for t in transactions if t["amount"] < 0)
     for t in transactions:
@@ -187,13 +541,16 @@ def calculate_by_category(transactions: list) -> dict:
 
 
 def analyze_by_time(transactions: list) -> dict:
+    if isinstance(transactions, (Aggregator, RollupCube, TransactionStore)):
+        return transactions.by_time()
+    if isinstance(transactions, TransactionFrame):
+        return _grouping(transactions).by_month(transactions)
     monthly = defaultdict(lambda: {"income": 0, "expenses": 0, "categories": []})
     for t in transactions:
-        try:
-            d = datetime.datetime.strptime(t["date"], "%Y-%m-%d")
-        except Exception:
+        d = decode_date(t["date"])
+        if d is None:
             continue
-        key = d.strftime("%Y-%m")
+        key = d.month_key
         if t["amount"] >= 0:
             monthly[key]["income"] += t["amount"]
         else:
@@ -204,15 +561,16 @@ def analyze_by_time(transactions: list) -> dict:
     return dict(monthly)
 
 def analyze_seasonal_trends(transactions: list) -> dict:
+    if isinstance(transactions, (Aggregator, RollupCube, TransactionStore)):
+        return transactions.by_quarter()
+    if isinstance(transactions, TransactionFrame):
+        return _grouping(transactions).by_quarter(transactions)
     quarterly = defaultdict(lambda: {"income": 0, "expenses": 0, "categories": []})
     for t in transactions:
-        try:
-            d = datetime.datetime.strptime(t["date"], "%Y-%m-%d")
-        except Exception:
+        d = decode_date(t["date"])
+        if d is None:
             continue
-        year = d.year
-        quarter = (d.month - 1) // 3 + 1
-        key = f"{year}-Q{quarter}"
+        key = d.quarter_key
         amount = t["amount"]
         if amount >= 0:
             quarterly[key]["income"] += amount
@@ -225,14 +583,17 @@ def analyze_seasonal_trends(transactions: list) -> dict:
     return dict(quarterly)
 
 def analyze_historical_spending(transactions: list) -> dict:
+    if isinstance(transactions, (Aggregator, RollupCube, TransactionStore)):
+        return transactions.historical_spending()
+    if isinstance(transactions, TransactionFrame):
+        return frame_analytics.historical_spending(transactions)
     monthly_spending = defaultdict(lambda: defaultdict(float))
     for t in transactions:
         if t["amount"] < 0:
-            try:
-                d = datetime.datetime.strptime(t["date"], "%Y-%m-%d")
-            except Exception:
+            d = decode_date(t["date"])
+            if d is None:
                 continue
-            month = d.strftime("%Y-%m")
+            month = d.month_key
             cat = t.get("category", f'{lcl.NO_CATEGORY}')
             monthly_spending[cat][month] += abs(t["amount"])
     avg_spending = {
@@ -248,6 +609,33 @@ def analyze_historical_spending(transactions: list) -> dict:
 # БЮДЖЕТ И СРАВНЕНИЕ
 # ==========================
 
+def analyze_rolling_spending(transactions, windows: tuple = WINDOWS, budget_window: int = BUDGET_WINDOW) -> dict:
+    """Скользящие средние расходов по категориям за 3/6/12 месяцев и их тренды (rolling.py).
+
+    Результат можно передать в create_budget_template вместо analyze_historical_spending:
+    лимиты тогда считаются по последним budget_window месяцам.
+    """
+    aggregator = transactions if isinstance(transactions, Aggregator) else aggregate(transactions)
+    return rolling_spending(aggregator.monthly_spending, windows, budget_window)
+
+
+def analyze_spending_quantiles(transactions, period: str = None, quantiles: tuple = QUANTILES) -> dict:
+    """Приближённые медиана/p90/p99 сумм расходов по категориям: {категория: {"count": n, q: сумма}}.
+
+    period — 'YYYY', 'YYYY-Qn' или 'YYYY-MM'. Принимает транзакции, SpendingSketches или
+    Aggregator, собранный со скетчами (Aggregator(sketches=SpendingSketches())).
+    """
+    if isinstance(transactions, SpendingSketches):
+        sketches = transactions
+    elif isinstance(transactions, Aggregator):
+        if transactions.sketches is None:
+            raise ValueError("aggregator was built without spending sketches")
+        sketches = transactions.sketches
+    else:
+        sketches = SpendingSketches().update(transactions)
+    return sketches.quantiles(period, quantiles)
+
+
 def create_budget_template(analysis: dict, total_income: float = None) -> dict:
     avg_spending = analysis.get("average_spending", {})
     total_expenses = sum(avg_spending.values())
@@ -259,10 +647,20 @@ def create_budget_template(analysis: dict, total_income: float = None) -> dict:
 
 
 def compare_budget_vs_actual(budget: dict, transactions: list) -> dict:
-    actual = defaultdict(float)
-    for t in transactions:
-        if t["amount"] < 0:
-            actual[t["category"]] += abs(t["amount"])
+    if isinstance(transactions, (Aggregator, RollupCube, TransactionStore)):
+        actual = transactions.actual_spending()
+    elif isinstance(transactions, TransactionFrame):
+        actual = _grouping(transactions).actual_by_category(transactions)
+    else:
+        actual = defaultdict(float)
+        for t in transactions:
+            if t["amount"] < 0:
+                actual[t["category"]] += abs(t["amount"])
+    return budget_report(budget, actual)
+
+
+def budget_report(budget: dict, actual: dict) -> dict:
+    """Сравнение бюджета с уже посчитанными фактическими расходами по категориям"""
     report = {}
     for cat, data in budget.items():
         limit = data["limit"]
@@ -281,83 +679,179 @@ def compare_budget_vs_actual(budget: dict, transactions: list) -> dict:
 # ВИЗУАЛИЗАЦИЯ
 # ==========================
 
-def visualize_financial_data(transactions: list):
+CHART_FORMATS = ("png",)
+EXPENSES_CHART_NAME = "expenses_by_category"
+
+
+def _load_pyplot(headless: bool):
+    """matplotlib импортируется только тогда, когда график действительно строится"""
+    import matplotlib
+    if headless:
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def visualize_financial_data(transactions: list, output_dir: str = None, formats: tuple = CHART_FORMATS) -> list:
     """Строит график: расходы по категориям и доходы/расходы по месяцам"""
     if not transactions:
         print(f'{lcl.NO_VISUALIZATION_DATA}')
-        return
+        return []
 
     # --- Расходы по категориям ---
     expenses = defaultdict(float)
     for t in transactions:
         if t["amount"] < 0:
             expenses[t["category"]] += abs(t["amount"])
-    if expenses:
-        plt.figure(figsize=(8, 5))
-        plt.bar(expenses.keys(), expenses.values())
-        plt.title(f'{lcl.EXPENSES_BY_CATEGORY}')
-        plt.xlabel(f'{lcl.CATEGORY}')
-        plt.ylabel(f'{lcl.AMOUNT_RUB}')
-        plt.xticks(rotation=45, ha="right")
-        plt.tight_layout()
+    return plot_expenses_by_category(expenses, output_dir, formats)
+
+
+def plot_expenses_by_category(expenses: dict, output_dir: str = None, formats: tuple = CHART_FORMATS) -> list:
+    """Столбчатая диаграмма по готовым суммам расходов {категория: сумма}.
+
+    Без output_dir график показывается в окне; с output_dir он рисуется без дисплея (Agg)
+    и сохраняется в каталог в каждом из форматов (png, svg, ...). Возвращает пути файлов.
+    """
+    if not expenses or (output_dir is not None and not formats):
+        return []
+    plt = _load_pyplot(headless=output_dir is not None)
+    plt.figure(figsize=(8, 5))
+    plt.bar(expenses.keys(), expenses.values())
+    plt.title(f'{lcl.EXPENSES_BY_CATEGORY}')
+    plt.xlabel(f'{lcl.CATEGORY}')
+    plt.ylabel(f'{lcl.AMOUNT_RUB}')
+    plt.xticks(rotation=45, ha="right")
+    plt.tight_layout()
+    if output_dir is None:
         plt.show()
+        return []
+    os.makedirs(output_dir, exist_ok=True)
+    saved = []
+    for fmt in formats:
+        path = os.path.join(output_dir, f"{EXPENSES_CHART_NAME}.{fmt}")
+        plt.savefig(path, format=fmt)
+        saved.append(path)
+    plt.close()
+    return saved
 
 
 # ==========================
 # ГЛАВНАЯ ФУНКЦИЯ
 # ==========================
 
-def smart_piggy_bank(csv_file="money.csv", json_file="transactions.json"):
+def smart_piggy_bank(csv_file="money.csv", json_file="transactions.json", cache_dir=None,
+                     chart_dir=None, chart_formats=CHART_FORMATS, metrics: PipelineMetrics = None,
+                     metrics_path: str = None, async_pipeline: bool = False,
+                     deduplicate: bool = True, report_path: str = None,
+                     report_format: str = None) -> PipelineMetrics:
+    """csv_file и json_file — путь, шаблон glob или список путей.
+
+    По умолчанию файлы читаются потоком, без удержания в памяти. cache_dir — каталог бинарных
+    снимков разобранных файлов (например, CACHE_DIR): повторные запуски берут готовые таблицы,
+    но каждый файл тогда целиком загружается в память.
+    chart_dir — сохранять графики в этот каталог без дисплея вместо показа в окне.
+    metrics — PipelineMetrics для замеров по этапам (например, с trace_memory/profile);
+    metrics_path — записать замеры в JSON. Возвращает заполненные метрики.
+    async_pipeline — без кэша читать, категоризировать и агрегировать файлы одновременно
+    (aggregate_files); пачки разных файлов тогда учитываются в порядке готовности.
+    deduplicate — отбрасывать строки, повторяющие предыдущие файлы (пересекающиеся выгрузки);
+    в режиме async_pipeline не применяется.
+    report_path — дополнительно сохранить отчёт в файл: JSON, CSV или Markdown
+    (report_format или расширение файла).
+    """
+    if report_path:
+        # неизвестный формат — ошибка до расчётов, а не после печати отчёта
+        report_format = report_file_format(report_path, report_format)
+    if metrics is None:
+        metrics = PipelineMetrics()
+    metrics.start()
+    try:
+        _run_piggy_bank(csv_file, json_file, cache_dir, chart_dir, chart_formats, metrics, async_pipeline,
+                        deduplicate, report_path, report_format)
+    finally:
+        metrics.stop()
+    if metrics_path:
+        metrics.write_json(metrics_path)
+    return metrics
+
+
+def _run_piggy_bank(csv_file, json_file, cache_dir, chart_dir, chart_formats, metrics: PipelineMetrics,
+                    async_pipeline: bool, deduplicate: bool, report_path: str, report_format: str):
     print("=" * 70)
     print("💰" f'{lcl.SMART_PIGGY_BANK}' "💡")
     print("=" * 70)
 
-    transactions = []
-    if csv_file:
-        transactions += import_financial_data(csv_file)
-    if json_file:
-        transactions += import_financial_data(json_file)
-
-    if not transactions:
+    # Файлы (пути, списки путей и шаблоны glob) читаются параллельно в пуле потоков;
+    # время "import" — ожидание очередной пачки основным потоком
+    paths = expand_paths([name for name in (csv_file, json_file) if name])
+    aggregator = Aggregator()
+    # с одним файлом отбрасывать нечего
+    dedup = None
+    if deduplicate and not async_pipeline and len(paths) > 1:
+        dedup = Deduplicator.for_paths(paths)
+    if cache_dir:
+        ruleset = default_ruleset()
+        frames = _iter_in_pool(lambda path: load_categorized_frame(path, ruleset, cache_dir),
+                               paths, IMPORT_WORKERS)
+        for path in paths:
+            with metrics.stage("import+categorize (cache)") as stage:
+                frame = next(frames)
+                stage.rows += len(frame)
+            if dedup is not None:
+                with metrics.stage("deduplicate", len(frame)):
+                    frame = dedup.filter_frame(frame, path)
+            with metrics.stage("aggregate", len(frame)):
+                aggregator.update(frame)
+    elif async_pipeline:
+        with metrics.stage("import+categorize+aggregate (asyncio)") as stage:
+            aggregator = aggregate_files(paths)
+            stage.rows += aggregator.transaction_count
+    else:
+        # категоризация и агрегация идут по мере чтения, память не растёт с размером выгрузок
+        ruleset = default_ruleset()
+        batches = iter_imported_batches(paths, with_paths=True)
+        while True:
+            with metrics.stage("import") as stage:
+                item = next(batches, None)
+                if item is not None:
+                    stage.rows += len(item[1])
+            if item is None:
+                break
+            path, batch = item
+            if dedup is not None:
+                with metrics.stage("deduplicate", len(batch)):
+                    batch = dedup.filter(batch, path)
+            with metrics.stage("categorize", len(batch)):
+                categorize_all_transactions(batch, ruleset)
+            with metrics.stage("aggregate", len(batch)):
+                aggregator.update(batch)
+
+    if dedup is not None and dedup.dropped:
+        print(f'♻️ {lcl.DUPLICATES_DROPPED} {dedup.dropped}')
+
+    if not aggregator.transaction_count:
         print("❌" f'{lcl.NO_ANALYSIS_DATA}')
         return
 
-    transactions = categorize_all_transactions(transactions)
-
-    stats = calculate_basic_stats(transactions)
-    categories_stats = calculate_by_category(transactions)
-    timeline = analyze_by_time(transactions)
-    analysis = analyze_historical_spending(transactions)
-    budget = create_budget_template(analysis, stats["total_income"])
-    comparison = compare_budget_vs_actual(budget, transactions)
+    with metrics.stage("analytics", aggregator.transaction_count):
+        stats = aggregator.basic_stats()
+        categories_stats = aggregator.by_category()
+        timeline = aggregator.by_time()
+        analysis = aggregator.historical_spending()
+    with metrics.stage("budget"):
+        budget = create_budget_template(analysis, stats["total_income"])
+        comparison = budget_report(budget, aggregator.actual_spending())
 
     # --- ОТЧЁТ ---
-    print("\n===" f'{lcl.FINANCIAL_REPORT}' "===")
-    print(f'💰 {lcl.INCOME} {stats['total_income']:.2f}')
-    print(f'💸 {lcl.EXPENSES} {abs(stats['total_expense']):.2f}')
-    print(f'⚖️ {lcl.BALANCE}{stats['balance']:.2f}')
-
-    print("\n📊" f'{lcl.EXPENSES_BY_CATEGORY_TITLE}')
-    for cat, data in categories_stats.items():
-        print(f"  {cat}: {abs(data['sum']):.2f}" f'{lcl.RUB}' "({data['percent']:.1f}%)")
-
-    print("\n📅" f'{lcl.MONTHLY_ANALYSIS}')
-    for month, data in timeline.items():
-        top = ", ".join([f"{c} ({n})" for c, n in data["top_categories"]])
-        print(f"  {month}:" f'{lcl.INCOME_LABEL}' "{data['income']:.2f} |" f'{lcl.EXPENSE_LABEL}' "{abs(data['expenses']):.2f} →" f'{lcl.TOP}' "{top}")
-
-    print("\n🎯" f'{lcl.RECOMMENDATIONS}')
-    for cat, val in analysis["top_categories"]:
-        print(f"  🔸 {cat}: {val:.2f}" f'{lcl.AVERAGE_RUB}')
-
-    print("\n📋" f'{lcl.BUDGET_COMPARISON}')
-    for cat, info in comparison.items():
-        print(f"  {cat}:" f'{lcl.SPENT}' "{info['actual']:.2f} /" f'{lcl.LIMIT}' "{info['limit']:.2f} → {info['status']}")
-
-    print("\n✅" f'{lcl.ANALYSIS_SUCCESS}' "\n")
+    with metrics.stage("report"):
+        report = build_report(stats, categories_stats, timeline, analysis, comparison)
+        write_report(report)
+        if report_path:
+            save_report(report, report_path, report_format)
 
     # Визуализация
-    visualize_financial_data(transactions)
+    with metrics.stage("charts"):
+        plot_expenses_by_category(aggregator.actual_spending(), chart_dir, chart_formats)
 
 
 if __name__ == "__main__":
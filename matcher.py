@@ -0,0 +1,69 @@
+from collections import deque
+
+# ==========================
+# АВТОМАТ АХО-КОРАСИК ДЛЯ КЛЮЧЕВЫХ СЛОВ
+# ==========================
+
+class KeywordAutomaton:
+    """Автомат Ахо-Корасик: за один проход по строке находит самый приоритетный ранг ключевого слова"""
+
+    __slots__ = ("_delta", "_rank", "_root_rank")
+
+    def __init__(self, ranked_keywords):
+        # ranked_keywords: пары (ключевое слово, ранг), меньший ранг — выше приоритет
+        no_rank = float("inf")
+        goto = [{}]
+        rank = [no_rank]
+        root_rank = no_rank
+
+        for keyword, keyword_rank in ranked_keywords:
+            if not keyword:
+                # пустое слово входит в любую строку
+                root_rank = min(root_rank, keyword_rank)
+                continue
+            node = 0
+            for ch in keyword:
+                nxt = goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[node][ch] = nxt
+                    goto.append({})
+                    rank.append(no_rank)
+                node = nxt
+            rank[node] = min(rank[node], keyword_rank)
+
+        # Обход в ширину: суффиксные ссылки и полная таблица переходов (ДКА)
+        delta = [dict(goto[0])]
+        delta.extend({} for _ in range(len(goto) - 1))
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            rank[node] = min(rank[node], rank[fail[node]])
+            transitions = dict(delta[fail[node]])
+            for ch, child in goto[node].items():
+                fail[child] = delta[fail[node]].get(ch, 0) if node else 0
+                transitions[ch] = child
+                queue.append(child)
+            delta[node] = transitions
+
+        self._delta = tuple(delta)
+        self._rank = tuple(rank)
+        self._root_rank = root_rank
+
+    def best_rank(self, text: str):
+        """Минимальный ранг среди ключевых слов, входящих в text, или None"""
+        delta = self._delta
+        rank = self._rank
+        best = self._root_rank
+        state = 0
+        for ch in text:
+            state = delta[state].get(ch, 0)
+            if rank[state] < best:
+                best = rank[state]
+                if best == 0:
+                    break
+        if best == float("inf"):
+            return None
+        return best
+
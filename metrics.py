@@ -0,0 +1,127 @@
+import cProfile
+import io
+import json
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# ==========================
+# МЕТРИКИ ЭТАПОВ КОНВЕЙЕРА
+# ==========================
+
+class StageMetrics:
+    """Время, число строк и изменение памяти одного этапа (повторные входы суммируются)"""
+
+    __slots__ = ("name", "seconds", "rows", "calls", "allocated_blocks", "allocated_bytes", "peak_bytes")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.seconds = 0.0
+        self.rows = 0
+        self.calls = 0
+        self.allocated_blocks = 0
+        self.allocated_bytes = None
+        self.peak_bytes = None
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "seconds": round(self.seconds, 6),
+            "rows": self.rows,
+            "calls": self.calls,
+            "rows_per_second": round(self.rows / self.seconds, 1) if self.seconds and self.rows else None,
+            "allocated_blocks": self.allocated_blocks,
+            "allocated_bytes": self.allocated_bytes,
+            "peak_bytes": self.peak_bytes,
+        }
+
+
+class PipelineMetrics:
+    """Замеры smart_piggy_bank по этапам: импорт, категоризация, агрегация, бюджет, отчёт.
+
+    trace_memory=True включает tracemalloc (байты и пики по этапам), profile=True — cProfile
+    на всё время работы. Без них считаются только время, строки и блоки памяти.
+    """
+
+    def __init__(self, trace_memory: bool = False, profile: bool = False):
+        self.trace_memory = trace_memory
+        self.stages = {}
+        self.profiler = cProfile.Profile() if profile else None
+        self.started = None
+        self.seconds = 0.0
+        self._owns_tracemalloc = False
+
+    def start(self):
+        self.started = time.perf_counter()
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._owns_tracemalloc = True
+        if self.profiler is not None:
+            self.profiler.enable()
+        return self
+
+    def stop(self):
+        if self.profiler is not None:
+            self.profiler.disable()
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+            self._owns_tracemalloc = False
+        if self.started is not None:
+            self.seconds += time.perf_counter() - self.started
+            self.started = None
+        return self
+
+    @contextmanager
+    def stage(self, name: str, rows: int = 0):
+        record = self.stages.get(name)
+        if record is None:
+            record = self.stages[name] = StageMetrics(name)
+        tracing = tracemalloc.is_tracing()
+        # пик сбрасывается только у своего tracemalloc: чужой пик (например, benchmark.measure
+        # вокруг всего запуска) не трогаем и пики этапов тогда не пишем
+        owns_peak = tracing and self._owns_tracemalloc
+        if tracing:
+            before_bytes = tracemalloc.get_traced_memory()[0]
+        if owns_peak:
+            tracemalloc.reset_peak()
+        before_blocks = sys.getallocatedblocks()
+        started = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record.seconds += time.perf_counter() - started
+            record.rows += rows
+            record.calls += 1
+            record.allocated_blocks += sys.getallocatedblocks() - before_blocks
+            if tracing:
+                current, peak = tracemalloc.get_traced_memory()
+                record.allocated_bytes = (record.allocated_bytes or 0) + current - before_bytes
+                if owns_peak:
+                    record.peak_bytes = max(record.peak_bytes or 0, peak)
+
+    def profile_text(self, limit: int = 30, sort: str = "cumulative") -> str:
+        if self.profiler is None:
+            return ""
+        import pstats  # ~20 мс на импорт: только когда профиль действительно печатается
+        out = io.StringIO()
+        pstats.Stats(self.profiler, stream=out).sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+    def to_dict(self) -> dict:
+        result = {
+            "total_seconds": round(self.seconds, 6),
+            "stages": [record.to_dict() for record in self.stages.values()],
+        }
+        if self.profiler is not None:
+            result["profile"] = self.profile_text()
+        return result
+
+    def write_json(self, filename: str):
+        with open(filename, "w", encoding="utf-8") as file:
+            json.dump(self.to_dict(), file, ensure_ascii=False, indent=2)
+
+    def write_profile(self, filename: str):
+        """Сохраняет сырые данные cProfile (для pstats/snakeviz)"""
+        if self.profiler is not None:
+            self.profiler.dump_stats(filename)
@@ -0,0 +1,160 @@
+import csv
+import mmap
+
+# ==========================
+# ЧТЕНИЕ CSV ЧЕРЕЗ MMAP
+# ==========================
+
+BLOCK_SIZE = 1 << 20
+
+
+def iter_csv_blocks(filename: str, columns: tuple, defaults: tuple):
+    """Выдаёт списки кортежей со значениями нужных колонок CSV, по блоку файла за раз.
+
+    Файл отображается в память, границы строк и полей ищутся по байтам, декодируются только
+    нужные поля. Если колонки нет в заголовке, подставляется значение из defaults, в короткой
+    строке — None (как у csv.DictReader). Строки с кавычками разбираются модулем csv.
+    """
+    with open(filename, "rb") as file:
+        try:
+            mm = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # пустой файл нельзя отобразить в память
+            return
+        with mm:
+            yield from _scan(mm, columns, defaults)
+
+
+def iter_csv_columns(filename: str, columns: tuple, defaults: tuple):
+    """То же, что iter_csv_blocks, но по одной строке"""
+    for rows in iter_csv_blocks(filename, columns, defaults):
+        yield from rows
+
+
+def _split_quoted(text: str) -> list:
+    return next(csv.reader([text]), [])
+
+
+def _next_line(mm, pos: int, size: int):
+    end = mm.find(b"\n", pos)
+    if end == -1:
+        end = size
+    line = mm[pos:end]
+    if line.endswith(b"\r"):
+        line = line[:-1]
+    return line, end + 1
+
+
+# состояния разбора кавычек, как в модуле csv: начало поля, поле без кавычек,
+# поле в кавычках, кавычка внутри поля в кавычках (конец поля или удвоенная "")
+_FIELD_START, _IN_FIELD, _IN_QUOTED, _QUOTE_IN_QUOTED = range(4)
+_QUOTE = ord('"')
+_COMMA = ord(",")
+
+
+def _quote_state(line: bytes, state: int) -> int:
+    # кавычка открывает поле только в его начале; в середине поля она обычный символ
+    for char in line:
+        if state == _IN_QUOTED:
+            if char == _QUOTE:
+                state = _QUOTE_IN_QUOTED
+        elif state == _IN_FIELD:
+            if char == _COMMA:
+                state = _FIELD_START
+        elif char == _QUOTE:
+            state = _IN_QUOTED
+        elif char == _COMMA:
+            state = _FIELD_START
+        else:
+            state = _IN_FIELD
+    return state
+
+
+def _join_quoted(mm, line: bytes, pos: int, size: int):
+    # пока поле в кавычках не закрыто, строка продолжается на следующей
+    state = _quote_state(line, _FIELD_START)
+    while state == _IN_QUOTED and pos < size:
+        rest, pos = _next_line(mm, pos, size)
+        line += b"\n" + rest
+        state = _quote_state(rest, _IN_QUOTED)
+    return line, pos
+
+
+def _pick(fields: list, index, default):
+    if index is None:
+        return default
+    if index >= len(fields):
+        return None
+    field = fields[index]
+    return field.decode("utf-8") if isinstance(field, bytes) else field
+
+
+def _scan(mm, columns: tuple, defaults: tuple):
+    size = len(mm)
+    # заголовок — первая строка, как у csv.DictReader; при повторе имени побеждает последняя колонка
+    line, pos = _next_line(mm, 0, size)
+    line, pos = _join_quoted(mm, line, pos, size)
+    position = {name: index for index, name in enumerate(_split_quoted(line.decode("utf-8")))}
+    indexes = [(position.get(name), default) for name, default in zip(columns, defaults)]
+
+    while pos < size:
+        # строки берутся блоками и режутся по b"\n" целиком, без поиска каждой границы в Python
+        end = size if pos + BLOCK_SIZE >= size else mm.rfind(b"\n", pos, pos + BLOCK_SIZE)
+        if end <= pos:
+            end = size
+        block = mm[pos:end]
+        if b'"' in block:
+            rows = []
+            pos = _scan_quoted(mm, pos, end, size, indexes, rows)
+        else:
+            pos = end + 1
+            rows = _scan_plain(block, indexes)
+        if rows:
+            yield rows
+
+
+def _scan_plain(block: bytes, indexes: list) -> list:
+    if b"\r" in block:
+        # блок обрезан по b"\n", поэтому последний \r остаётся без пары
+        block = block.replace(b"\r\n", b"\n")
+        if block.endswith(b"\r"):
+            block = block[:-1]
+    rows = []
+    append = rows.append
+    positions = [index for index, _ in indexes]
+    if len(positions) == 3 and None not in positions:
+        # частый случай: дата, сумма и описание есть в заголовке
+        first, second, third = positions
+        need = max(positions) + 1
+        for line in block.split(b"\n"):
+            if not line:
+                continue
+            fields = line.split(b",")
+            if len(fields) >= need:
+                append((fields[first].decode("utf-8"), fields[second].decode("utf-8"),
+                        fields[third].decode("utf-8")))
+            else:
+                append(tuple(_pick(fields, index, default) for index, default in indexes))
+        return rows
+    for line in block.split(b"\n"):
+        if line:
+            fields = line.split(b",")
+            append(tuple(_pick(fields, index, default) for index, default in indexes))
+    return rows
+
+
+def _scan_quoted(mm, pos: int, end: int, size: int, indexes: list, rows: list) -> int:
+    # медленный путь для блока с кавычками: построчно, с полями в несколько строк
+    while pos <= end and pos < size:
+        line, pos = _next_line(mm, pos, size)
+        if not line:
+            continue
+        if b'"' in line:
+            line, pos = _join_quoted(mm, line, pos, size)
+            fields = _split_quoted(line.decode("utf-8"))
+            if not fields:
+                continue
+        else:
+            fields = line.split(b",")
+        rows.append(tuple(_pick(fields, index, default) for index, default in indexes))
+    return pos
@@ -0,0 +1,107 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from engine import Aggregator
+from ruleset import CategoryRuleset, _init_worker, _categorize_chunk
+
+# ==========================
+# АСИНХРОННЫЙ КОНВЕЙЕР ИМПОРТА
+# ==========================
+
+PIPELINE_QUEUE_BATCHES = 4
+PIPELINE_READERS = 8
+
+_DONE = object()
+
+
+async def run_pipeline(paths: list, iter_batches, ruleset: CategoryRuleset, aggregator: Aggregator = None,
+                       workers: int = None, queue_batches: int = PIPELINE_QUEUE_BATCHES,
+                       max_readers: int = PIPELINE_READERS) -> Aggregator:
+    """Чтение, категоризация и агрегация файлов, работающие одновременно.
+
+    iter_batches(path) выдаёт пачки транзакций файла; чтение идёт в потоках, не больше max_readers
+    файлов сразу. Пачки проходят через очереди длиной queue_batches: когда категоризация или
+    агрегация отстают, читатели ждут, и в памяти остаётся ограниченное число пачек.
+    workers > 1 — категоризация в пуле процессов, иначе в отдельном потоке.
+    Пачки разных файлов приходят в агрегатор в порядке готовности, а не путей.
+    """
+    if aggregator is None:
+        aggregator = Aggregator()
+    if workers is None:
+        workers = os.cpu_count() or 1
+    raw = asyncio.Queue(maxsize=queue_batches)
+    categorized = asyncio.Queue(maxsize=queue_batches)
+    limit = asyncio.Semaphore(max_readers)
+
+    if workers > 1:
+        categorize_executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                                  initargs=(ruleset,))
+        categorize = _categorize_chunk
+        categorizers = workers
+    else:
+        categorize_executor = ThreadPoolExecutor(max_workers=1)
+        categorize = ruleset.categorize_many
+        categorizers = 1
+
+    async def read_all():
+        await asyncio.gather(*(_read_file(path, iter_batches, raw, read_executor, limit) for path in paths))
+        for _ in range(categorizers):
+            await raw.put(_DONE)
+
+    async def categorize_all():
+        await asyncio.gather(*(_categorize(raw, categorized, categorize_executor, categorize)
+                               for _ in range(categorizers)))
+        await categorized.put(_DONE)
+
+    with ThreadPoolExecutor(max_workers=max_readers) as read_executor, \
+            ThreadPoolExecutor(max_workers=1) as aggregate_executor, categorize_executor:
+        await _gather_or_cancel(read_all(), categorize_all(),
+                                _aggregate(categorized, aggregate_executor, aggregator))
+    return aggregator
+
+
+async def _gather_or_cancel(*coroutines):
+    # при ошибке одного этапа остальные отменяются, чтобы никто не ждал в очереди вечно
+    tasks = [asyncio.ensure_future(coroutine) for coroutine in coroutines]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+async def _read_file(path, iter_batches, out: asyncio.Queue, executor, limit: asyncio.Semaphore):
+    loop = asyncio.get_running_loop()
+    async with limit:
+        batches = iter_batches(path)
+        while True:
+            batch = await loop.run_in_executor(executor, next, batches, None)
+            if batch is None:
+                return
+            await out.put(batch)
+
+
+async def _categorize(inp: asyncio.Queue, out: asyncio.Queue, executor, categorize):
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = await inp.get()
+        if batch is _DONE:
+            return
+        descriptions = [t.get("description", "") for t in batch]
+        categories = await loop.run_in_executor(executor, categorize, descriptions)
+        for transaction, category in zip(batch, categories):
+            transaction["category"] = category
+        await out.put(batch)
+
+
+async def _aggregate(inp: asyncio.Queue, executor, aggregator: Aggregator):
+    # один поток-агрегатор: состояние меняется строго последовательно
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = await inp.get()
+        if batch is _DONE:
+            return
+        await loop.run_in_executor(executor, aggregator.update, batch)
@@ -0,0 +1,156 @@
+import csv
+import io
+import json
+import os
+import sys
+
+import local as lcl
+
+# ==========================
+# ОТЧЁТ: СТРУКТУРА И ФОРМАТЫ
+# ==========================
+
+REPORT_FORMATS = ("console", "json", "csv", "md")
+FORMAT_ALIASES = {"txt": "console", "markdown": "md"}
+WRITE_BUFFER_SIZE = 1 << 16
+
+
+def build_report(stats: dict, categories_stats: dict, timeline: dict, analysis: dict, comparison: dict) -> dict:
+    """Структура отчёта, из которой рисуются все форматы (списки строк по месяцам не нужны и опускаются)"""
+    return {
+        "stats": stats,
+        "categories": categories_stats,
+        "timeline": {
+            month: {"income": data["income"], "expenses": data["expenses"],
+                    "top_categories": data["top_categories"]}
+            for month, data in timeline.items()
+        },
+        "recommendations": analysis["top_categories"],
+        "budget": comparison
+    }
+
+
+def render_console(report: dict, out):
+    """Текстовый отчёт, как его печатает smart_piggy_bank"""
+    write = out.write
+    stats = report["stats"]
+    write("\n===" f'{lcl.FINANCIAL_REPORT}' "===\n")
+    write(f'💰 {lcl.INCOME} {stats['total_income']:.2f}\n')
+    write(f'💸 {lcl.EXPENSES} {abs(stats['total_expense']):.2f}\n')
+    write(f'⚖️ {lcl.BALANCE}{stats['balance']:.2f}\n')
+
+    write("\n📊" f'{lcl.EXPENSES_BY_CATEGORY_TITLE}\n')
+    for cat, data in report["categories"].items():
+        write(f"  {cat}: {abs(data['sum']):.2f}" f'{lcl.RUB}' "({data['percent']:.1f}%)\n")
+
+    write("\n📅" f'{lcl.MONTHLY_ANALYSIS}\n')
+    for month, data in report["timeline"].items():
+        write(f"  {month}:" f'{lcl.INCOME_LABEL}' "{data['income']:.2f} |" f'{lcl.EXPENSE_LABEL}' "{abs(data['expenses']):.2f} →" f'{lcl.TOP}' "{top}\n")
+
+    write("\n🎯" f'{lcl.RECOMMENDATIONS}\n')
+    for cat, val in report["recommendations"]:
+        write(f"  🔸 {cat}: {val:.2f}" f'{lcl.AVERAGE_RUB}\n')
+
+    write("\n📋" f'{lcl.BUDGET_COMPARISON}\n')
+    for cat, info in report["budget"].items():
+        write(f"  {cat}:" f'{lcl.SPENT}' "{info['actual']:.2f} /" f'{lcl.LIMIT}' "{info['limit']:.2f} → {info['status']}\n")
+
+    write("\n✅" f'{lcl.ANALYSIS_SUCCESS}' "\n\n")
+
+
+def render_json(report: dict, out):
+    json.dump(report, out, ensure_ascii=False, indent=2)
+    out.write("\n")
+
+
+def render_csv(report: dict, out):
+    """Одна таблица в длинном формате: раздел, ключ, поле, значение"""
+    writer = csv.writer(out)
+    writer.writerow(["section", "key", "field", "value"])
+    writer.writerows(("stats", name, "", value) for name, value in report["stats"].items())
+    for cat, data in report["categories"].items():
+        writer.writerows(("category", cat, field, value) for field, value in data.items())
+    for month, data in report["timeline"].items():
+        writer.writerow(("month", month, "income", data["income"]))
+        writer.writerow(("month", month, "expenses", data["expenses"]))
+        writer.writerows(("month", month, f"top:{cat}", count) for cat, count in data["top_categories"])
+    writer.writerows(("recommendation", cat, "average", value) for cat, value in report["recommendations"])
+    for cat, info in report["budget"].items():
+        writer.writerows(("budget", cat, field, value) for field, value in info.items())
+
+
+def _md_cell(value) -> str:
+    if isinstance(value, float):
+        value = f"{value:.2f}"
+    return str(value).replace("|", "\\|")
+
+
+def _md_table(out, header: list, rows):
+    out.write("| " + " | ".join(header) + " |\n")
+    out.write("|" + "---|" * len(header) + "\n")
+    for row in rows:
+        out.write("| " + " | ".join(_md_cell(value) for value in row) + " |\n")
+    out.write("\n")
+
+
+def render_markdown(report: dict, out):
+    stats = report["stats"]
+    out.write(f"# {lcl.FINANCIAL_REPORT}\n\n")
+    _md_table(out, ["", ""], [(lcl.INCOME, stats["total_income"]),
+                              (lcl.EXPENSES, abs(stats["total_expense"])),
+                              (lcl.BALANCE, stats["balance"])])
+    out.write(f"## {lcl.EXPENSES_BY_CATEGORY_TITLE}\n\n")
+    _md_table(out, [lcl.CATEGORY, lcl.RUB, "%", "n"],
+              ((cat, abs(data["sum"]), f"{data['percent']:.1f}", data["count"])
+               for cat, data in report["categories"].items()))
+    out.write(f"## {lcl.MONTHLY_ANALYSIS}\n\n")
+    _md_table(out, ["", lcl.INCOME_LABEL, lcl.EXPENSE_LABEL, lcl.TOP],
+              ((month, data["income"], abs(data["expenses"]),
+                ", ".join(f"{c} ({n})" for c, n in data["top_categories"]))
+               for month, data in report["timeline"].items()))
+    out.write(f"## {lcl.RECOMMENDATIONS}\n\n")
+    _md_table(out, [lcl.CATEGORY, lcl.AVERAGE_RUB], report["recommendations"])
+    out.write(f"## {lcl.BUDGET_COMPARISON}\n\n")
+    _md_table(out, [lcl.CATEGORY, lcl.SPENT, lcl.LIMIT, ""],
+              ((cat, info["actual"], info["limit"], info["status"]) for cat, info in report["budget"].items()))
+
+
+RENDERERS = {
+    "console": render_console,
+    "json": render_json,
+    "csv": render_csv,
+    "md": render_markdown,
+}
+
+
+def resolve_format(fmt: str) -> str:
+    """Название формата с учётом синонимов (markdown -> md, txt -> console)"""
+    fmt = FORMAT_ALIASES.get(fmt, fmt)
+    if fmt not in RENDERERS:
+        raise ValueError(f"unknown report format: {fmt!r}")
+    return fmt
+
+
+def report_file_format(filename: str, fmt: str = None) -> str:
+    """Формат файла отчёта: fmt или расширение (.json, .csv, .md, .markdown, .txt)"""
+    if fmt is None:
+        fmt = os.path.splitext(filename)[1].lower().lstrip(".") or "console"
+    return resolve_format(fmt)
+
+
+def write_report(report: dict, fmt: str = "console", out=None):
+    """Пишет отчёт в поток out (по умолчанию stdout) одним буферизованным блоком"""
+    fmt = resolve_format(fmt)
+    if out is None:
+        out = sys.stdout
+    buffer = io.StringIO()
+    RENDERERS[fmt](report, buffer)
+    out.write(buffer.getvalue())
+
+
+def save_report(report: dict, filename: str, fmt: str = None):
+    """Сохраняет отчёт в файл; формат по расширению (.json, .csv, .md), если не задан"""
+    fmt = report_file_format(filename, fmt)
+    newline = "" if fmt == "csv" else None
+    with open(filename, "w", encoding="utf-8", newline=newline, buffering=WRITE_BUFFER_SIZE) as file:
+        RENDERERS[fmt](report, file)
@@ -0,0 +1,67 @@
+from dates import month_key, month_key_code
+
+# ==========================
+# СКОЛЬЗЯЩИЕ СРЕДНИЕ ПО МЕСЯЦАМ
+# ==========================
+
+WINDOWS = (3, 6, 12)
+BUDGET_WINDOW = 3
+
+
+def rolling_category(months: dict, last_code: int, windows: tuple = WINDOWS) -> dict:
+    """Скользящие средние трат одной категории по месяцам {'YYYY-MM': сумма}.
+
+    Ряд идёт без пропусков от первого месяца категории до last_code; месяц без трат — 0.
+    Все окна считаются за один проход скользящими суммами. Пока месяцев меньше окна,
+    среднее берётся по имеющимся. trend — изменение среднего за последнее окно
+    относительно предыдущего окна той же длины (None, если истории не хватает).
+    """
+    values = {month_key_code(key): amount for key, amount in months.items()}
+    first_code = min(values)
+    series = [values.get(code, 0.0) for code in range(first_code, last_code + 1)]
+    sums = dict.fromkeys(windows, 0.0)
+    averages = {window: [] for window in windows}
+    for index, value in enumerate(series):
+        for window in windows:
+            total = sums[window] + value
+            if index >= window:
+                total -= series[index - window]
+            sums[window] = total
+            averages[window].append(total / min(index + 1, window))
+    latest = {window: averages[window][-1] for window in windows}
+    trend = {
+        window: averages[window][-1] - averages[window][-1 - window] if len(series) >= 2 * window else None
+        for window in windows
+    }
+    return {
+        "months": [month_key(code) for code in range(first_code, last_code + 1)],
+        "moving_average": averages,
+        "latest": latest,
+        "trend": trend
+    }
+
+
+def rolling_spending(monthly_spending: dict, windows: tuple = WINDOWS, budget_window: int = BUDGET_WINDOW) -> dict:
+    """Скользящие средние по категориям из {категория: {'YYYY-MM': сумма расходов}}.
+
+    average_spending и top_categories — как у analyze_historical_spending, но по последнему
+    окну budget_window месяцев, поэтому результат подходит для create_budget_template.
+    """
+    if budget_window not in windows:
+        windows = tuple(windows) + (budget_window,)
+    codes = [month_key_code(key) for months in monthly_spending.values() for key in months]
+    if not codes:
+        return {"average_spending": {}, "top_categories": [], "categories": {}, "window": budget_window}
+    last_code = max(codes)
+    categories = {
+        cat: rolling_category(months, last_code, windows)
+        for cat, months in monthly_spending.items() if months
+    }
+    avg_spending = {cat: round(data["latest"][budget_window], 2) for cat, data in categories.items()}
+    top_cats = sorted(avg_spending.items(), key=lambda x: x[1], reverse=True)[:3]
+    return {
+        "average_spending": avg_spending,
+        "top_categories": top_cats,
+        "categories": categories,
+        "window": budget_window
+    }
@@ -0,0 +1,101 @@
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+
+import local as lcl
+from matcher import KeywordAutomaton
+
+# ==========================
+# СКОМПИЛИРОВАННЫЙ НАБОР ПРАВИЛ КАТЕГОРИЗАЦИИ
+# ==========================
+
+class CategoryRuleset:
+    """Неизменяемый набор правил: категории по приоритету, ключевые слова, их ранги и автомат"""
+
+    __slots__ = ("priority", "keywords", "ranks", "other", "version", "_automaton")
+
+    def __init__(self, categories: dict, categories_priority: list, other: str = f'{lcl.OTHER}'):
+        priority = tuple(categories_priority)
+        # Слова хранятся как есть: описание приводится к нижнему регистру перед поиском,
+        # поэтому слово с заглавными буквами (например lcl.INCOME) не совпадает никогда — как и раньше
+        keywords = tuple(tuple(categories.get(category, [])) for category in priority)
+        ranks = {}
+        for index, category in enumerate(priority):
+            ranks.setdefault(category, index)
+
+        digest = hashlib.sha1()
+        for category, words in zip(priority, keywords):
+            digest.update(category.encode("utf-8") + b"\0")
+            digest.update("\x1f".join(words).encode("utf-8") + b"\0")
+        digest.update(other.encode("utf-8"))
+
+        ranked = [(keyword, index) for index, words in enumerate(keywords) for keyword in words]
+        set_attr = object.__setattr__
+        set_attr(self, "priority", priority)
+        set_attr(self, "keywords", keywords)
+        set_attr(self, "ranks", ranks)
+        set_attr(self, "other", other)
+        set_attr(self, "version", digest.hexdigest()[:16])
+        set_attr(self, "_automaton", KeywordAutomaton(ranked))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("CategoryRuleset is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("CategoryRuleset is immutable")
+
+    def __reduce__(self):
+        # в процессы-воркеры передаются только исходные данные, автомат собирается на месте
+        return (_rebuild_ruleset, (self.priority, self.keywords, self.other))
+
+    def __eq__(self, other):
+        return isinstance(other, CategoryRuleset) and self.version == other.version
+
+    def __hash__(self):
+        return hash(self.version)
+
+    def __repr__(self):
+        return f"CategoryRuleset(categories={len(self.priority)}, version={self.version!r})"
+
+    def categorize(self, description: str) -> str:
+        best = self._automaton.best_rank(description.lower())
+        if best is None:
+            return self.other
+        return self.priority[best]
+
+    def categorize_many(self, descriptions) -> list:
+        categorize = self.categorize
+        return [categorize(description) for description in descriptions]
+
+
+def _rebuild_ruleset(priority, keywords, other):
+    return CategoryRuleset(dict(zip(priority, keywords)), priority, other)
+
+
+# ==========================
+# ПАРАЛЛЕЛЬНАЯ КАТЕГОРИЗАЦИЯ
+# ==========================
+
+_worker_ruleset = None
+
+
+def _init_worker(ruleset: CategoryRuleset):
+    # набор правил попадает в процесс один раз — при старте воркера
+    global _worker_ruleset
+    _worker_ruleset = ruleset
+
+
+def _categorize_chunk(descriptions: list) -> list:
+    return _worker_ruleset.categorize_many(descriptions)
+
+
+def categorize_parallel(descriptions: list, ruleset: CategoryRuleset, workers: int = None,
+                        chunk_size: int = 50000) -> list:
+    """Категоризирует описания в пуле процессов; порядок результатов совпадает с входным"""
+    chunks = [descriptions[i:i + chunk_size] for i in range(0, len(descriptions), chunk_size)]
+    if len(chunks) <= 1 or workers == 1:
+        return ruleset.categorize_many(descriptions)
+    result = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(ruleset,)) as executor:
+        for categories in executor.map(_categorize_chunk, chunks):
+            result.extend(categories)
+    return result
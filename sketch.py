@@ -0,0 +1,190 @@
+import math
+
+import local as lcl
+from dates import decode_date, month_key, in_period
+from frame import TransactionFrame, NO_CODE, _category_labels
+
+# ==========================
+# КВАНТИЛЬНЫЕ СКЕТЧИ
+# ==========================
+
+RELATIVE_ACCURACY = 0.01
+MAX_BUCKETS = 2048
+# суммы меньше этого считаются нулём
+MIN_VALUE = 1e-9
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+class QuantileSketch:
+    """Скетч в духе DDSketch: логарифмические корзины с относительной точностью relative_accuracy.
+
+    Память ограничена max_buckets корзинами (при переполнении сливаются самые младшие,
+    поэтому верхние квантили остаются точными). Скетчи с одинаковой точностью сливаются
+    без потерь: merge() складывает счётчики корзин.
+    """
+
+    __slots__ = ("relative_accuracy", "max_buckets", "_log_gamma", "buckets", "zero_count", "count")
+
+    def __init__(self, relative_accuracy: float = RELATIVE_ACCURACY, max_buckets: int = MAX_BUCKETS):
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self._log_gamma = math.log((1 + relative_accuracy) / (1 - relative_accuracy))
+        self.buckets = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, value: float, count: int = 1):
+        """Добавляет неотрицательное значение (например, сумму покупки)"""
+        self.count += count
+        if value < MIN_VALUE:
+            self.zero_count += count
+            return
+        index = math.ceil(math.log(value) / self._log_gamma)
+        buckets = self.buckets
+        buckets[index] = buckets.get(index, 0) + count
+        if len(buckets) > self.max_buckets:
+            self._collapse()
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("cannot merge sketches with different relative accuracy")
+        buckets = self.buckets
+        for index, count in other.buckets.items():
+            buckets[index] = buckets.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        if len(buckets) > self.max_buckets:
+            self._collapse()
+        return self
+
+    def _collapse(self):
+        ordered = sorted(self.buckets)
+        extra = len(ordered) - self.max_buckets
+        target = ordered[extra]
+        for index in ordered[:extra]:
+            self.buckets[target] += self.buckets.pop(index)
+
+    def quantile(self, q: float):
+        """Приближённый квантиль q из [0, 1]; None для пустого скетча"""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if seen > rank:
+            return 0.0
+        gamma = math.exp(self._log_gamma)
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                # середина корзины (gamma^(i-1), gamma^i] с относительной ошибкой не больше точности
+                return 2 * gamma ** index / (gamma + 1)
+        return 2 * gamma ** max(self.buckets) / (gamma + 1)
+
+    def to_dict(self) -> dict:
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "max_buckets": self.max_buckets,
+            "zero_count": self.zero_count,
+            "count": self.count,
+            "buckets": {str(index): count for index, count in self.buckets.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "QuantileSketch":
+        sketch = cls(state["relative_accuracy"], state["max_buckets"])
+        sketch.zero_count = state["zero_count"]
+        sketch.count = state["count"]
+        sketch.buckets = {int(index): count for index, count in state["buckets"].items()}
+        return sketch
+
+    def __reduce__(self):
+        return _rebuild_sketch, (self.to_dict(),)
+
+
+def _rebuild_sketch(state: dict) -> QuantileSketch:
+    return QuantileSketch.from_dict(state)
+
+
+class SpendingSketches:
+    """Скетчи сумм расходов по (категория, месяц 'YYYY-MM').
+
+    Квантили за квартал, год или всё время получаются слиянием месячных скетчей;
+    наборы из разных файлов или процессов объединяются через merge().
+    """
+
+    def __init__(self, relative_accuracy: float = RELATIVE_ACCURACY, max_buckets: int = MAX_BUCKETS):
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.sketches = {}
+
+    def add(self, category: str, month: str, amount: float):
+        """Учитывает расход (amount < 0) категории за месяц; доходы пропускаются"""
+        if amount >= 0:
+            return
+        key = (category, month)
+        sketch = self.sketches.get(key)
+        if sketch is None:
+            sketch = self.sketches[key] = QuantileSketch(self.relative_accuracy, self.max_buckets)
+        sketch.add(-amount)
+
+    def update(self, transactions) -> "SpendingSketches":
+        """Добавляет транзакции с корректной датой: список записей или словарей, поток или TransactionFrame"""
+        add = self.add
+        if isinstance(transactions, TransactionFrame):
+            labels = _category_labels(transactions)
+            for amount, month_code, code in zip(transactions.amounts, transactions.month_codes,
+                                                transactions.category_codes):
+                if month_code != NO_CODE:
+                    add(labels[code], month_key(month_code), amount)
+            return self
+        for t in transactions:
+            info = decode_date(t["date"])
+            if info is not None:
+                add(t.get("category", f'{lcl.NO_CATEGORY}'), info.month_key, t["amount"])
+        return self
+
+    def merge(self, other: "SpendingSketches") -> "SpendingSketches":
+        for key, sketch in other.sketches.items():
+            own = self.sketches.get(key)
+            if own is None:
+                own = self.sketches[key] = QuantileSketch(sketch.relative_accuracy, self.max_buckets)
+            own.merge(sketch)
+        return self
+
+    def sketch(self, category: str = None, period: str = None) -> QuantileSketch:
+        """Слияние скетчей категории (None — всех) за период 'YYYY', 'YYYY-Qn', 'YYYY-MM' (None — всё время)"""
+        result = QuantileSketch(self.relative_accuracy, self.max_buckets)
+        for (cat, month), sketch in self.sketches.items():
+            if (category is None or cat == category) and in_period(month, period):
+                result.merge(sketch)
+        return result
+
+    def quantiles(self, period: str = None, quantiles: tuple = QUANTILES) -> dict:
+        """{категория: {"count": n, 0.5: ..., 0.9: ..., 0.99: ...}} за период"""
+        merged = {}
+        for (cat, month), sketch in self.sketches.items():
+            if in_period(month, period):
+                target = merged.get(cat)
+                if target is None:
+                    target = merged[cat] = QuantileSketch(self.relative_accuracy, self.max_buckets)
+                target.merge(sketch)
+        result = {}
+        for cat, sketch in merged.items():
+            result[cat] = {"count": sketch.count}
+            for q in quantiles:
+                result[cat][q] = sketch.quantile(q)
+        return result
+
+    def to_dict(self) -> dict:
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "max_buckets": self.max_buckets,
+            "sketches": [[cat, month, sketch.to_dict()] for (cat, month), sketch in self.sketches.items()]
+        }
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "SpendingSketches":
+        sketches = cls(state["relative_accuracy"], state["max_buckets"])
+        sketches.sketches = {(cat, month): QuantileSketch.from_dict(sketch)
+                             for cat, month, sketch in state["sketches"]}
+        return sketches
@@ -0,0 +1,143 @@
+import hashlib
+import marshal
+import os
+import sys
+from array import array
+
+from frame import TransactionFrame, decode_date_codes
+
+# ==========================
+# БИНАРНЫЙ КЭШ РАЗОБРАННЫХ ТРАНЗАКЦИЙ
+# ==========================
+
+CACHE_DIR = ".piggy_cache"
+MAX_ENTRIES = 256
+SNAPSHOT_MAGIC = b"PIGGYSNAP1"
+SNAPSHOT_SUFFIX = ".snap"
+
+_ARRAY_COLUMNS = (("amounts", "d"), ("type_codes", "b"), ("category_codes", "h"))
+
+def file_digest(filename: str) -> str:
+    digest = hashlib.blake2b(digest_size=20)
+    with open(filename, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _entry_path(cache_dir: str, filename: str) -> str:
+    name = hashlib.sha1(os.path.abspath(filename).encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir, name + SNAPSHOT_SUFFIX)
+
+
+def _cache_key(filename: str, ruleset_version: str) -> tuple:
+    stat = os.stat(filename)
+    return (os.path.abspath(filename), stat.st_size, stat.st_mtime_ns, file_digest(filename),
+            ruleset_version, sys.byteorder)
+
+
+def _intern_column(values) -> tuple:
+    # строки повторяются: храним таблицу уникальных значений и индекс на каждую строку
+    index = {}
+    codes = array("i", (index.setdefault(value, len(index)) for value in values))
+    return list(index), codes.tobytes()
+
+
+def _expand_column(table: list, raw: bytes) -> list:
+    codes = array("i")
+    codes.frombytes(raw)
+    return [table[code] for code in codes]
+
+
+def _dump(frame: TransactionFrame, key: tuple) -> bytes:
+    payload = (
+        key,
+        _intern_column(frame.dates),
+        _intern_column(frame.descriptions),
+        frame.category_names,
+        tuple(getattr(frame, column).tobytes() for column, _ in _ARRAY_COLUMNS),
+    )
+    return SNAPSHOT_MAGIC + marshal.dumps(payload)
+
+
+def _load(data: bytes, key: tuple):
+    if not data.startswith(SNAPSHOT_MAGIC):
+        return None
+    stored_key, dates, descriptions, category_names, columns = marshal.loads(data[len(SNAPSHOT_MAGIC):])
+    if tuple(stored_key) != key:
+        return None
+    arrays = {}
+    for (column, typecode), raw in zip(_ARRAY_COLUMNS, columns):
+        arrays[column] = array(typecode)
+        arrays[column].frombytes(raw)
+    # коды дней и месяцев не хранятся: они восстанавливаются по таблице уникальных дат
+    date_table, date_codes = dates
+    decoded = [decode_date_codes(date) for date in date_table]
+    codes = array("i")
+    codes.frombytes(date_codes)
+    arrays["day_codes"] = array("l", (decoded[code][0] for code in codes))
+    arrays["month_codes"] = array("l", (decoded[code][1] for code in codes))
+    return TransactionFrame.from_columns(
+        [date_table[code] for code in codes], _expand_column(*descriptions),
+        category_names=category_names, **arrays)
+
+
+def load_snapshot(filename: str, ruleset_version: str, parse, cache_dir: str = CACHE_DIR) -> TransactionFrame:
+    """Возвращает разобранные и категоризированные транзакции файла из кэша или через parse(filename).
+
+    Снимок действителен, пока совпадают путь, размер, mtime, хэш содержимого и версия правил;
+    устаревший снимок удаляется и пересобирается.
+    """
+    if not os.path.exists(filename):
+        return parse(filename)
+    key = _cache_key(filename, ruleset_version)
+    entry = _entry_path(cache_dir, filename)
+    try:
+        with open(entry, "rb") as file:
+            frame = _load(file.read(), key)
+        if frame is not None:
+            os.utime(entry)
+            return frame
+        os.remove(entry)
+    except FileNotFoundError:
+        pass
+    except (ValueError, EOFError, TypeError, OSError):
+        # повреждённый снимок просто пересобирается
+        _remove(entry)
+
+    frame = parse(filename)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_name = f"{entry}.{os.getpid()}.tmp"
+    with open(tmp_name, "wb") as file:
+        file.write(_dump(frame, key))
+    os.replace(tmp_name, entry)
+    evict(cache_dir)
+    return frame
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _mtime(path: str) -> int:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return 0
+
+
+def evict(cache_dir: str = CACHE_DIR, max_entries: int = MAX_ENTRIES):
+    """Удаляет самые давно использованные снимки сверх max_entries"""
+    try:
+        names = [name for name in os.listdir(cache_dir) if name.endswith(SNAPSHOT_SUFFIX)]
+    except FileNotFoundError:
+        return
+    if len(names) <= max_entries:
+        return
+    paths = [os.path.join(cache_dir, name) for name in names]
+    paths.sort(key=_mtime)
+    for path in paths[:len(paths) - max_entries]:
+        _remove(path)
@@ -0,0 +1,163 @@
+import itertools
+import sqlite3
+import statistics
+from collections import Counter
+
+import local as lcl
+from dates import decode_date, month_key, quarter_of
+from frame import TransactionFrame, NO_CODE
+
+# ==========================
+# ХРАНИЛИЩЕ SQLITE
+# ==========================
+
+INSERT_BATCH_SIZE = 10000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY,
+    date TEXT NOT NULL,
+    amount REAL NOT NULL,
+    description TEXT NOT NULL,
+    category TEXT,
+    month TEXT,
+    quarter TEXT
+);
+CREATE INDEX IF NOT EXISTS transactions_date ON transactions (date);
+CREATE INDEX IF NOT EXISTS transactions_category ON transactions (category);
+CREATE INDEX IF NOT EXISTS transactions_month ON transactions (month, category, amount);
+"""
+
+
+def _rows(transactions):
+    """(дата, сумма, описание, категория, месяц, квартал) для вставки; месяц и квартал — NULL для плохой даты"""
+    if isinstance(transactions, TransactionFrame):
+        names = transactions.category_names
+        for date, amount, description, month_code, code in zip(
+                transactions.dates, transactions.amounts, transactions.descriptions,
+                transactions.month_codes, transactions.category_codes):
+            month = None if month_code == NO_CODE else month_key(month_code)
+            yield (date, amount, description, None if code == NO_CODE else names[code],
+                   month, month and quarter_of(month))
+        return
+    for t in transactions:
+        info = decode_date(t["date"])
+        yield (t["date"], t["amount"], t.get("description", ""), t.get("category"),
+               info and info.month_key, info and info.quarter_key)
+
+
+class TransactionStore:
+    """Транзакции в SQLite с индексами по дате, категории и месяцу.
+
+    Аналитика считается агрегатными запросами в базе, строки в Python не загружаются.
+    Порядок ключей и выбор при равенстве — по первой вставленной строке (MIN(id)),
+    как у функций из main.py. Суммы считает SQLite, поэтому в последних знаках
+    они могут отличаться от сложения в Python.
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+
+    def insert(self, transactions, batch_size: int = INSERT_BATCH_SIZE) -> int:
+        """Вставляет транзакции (список, поток или TransactionFrame) пачками через executemany"""
+        rows = _rows(transactions)
+        count = 0
+        with self.connection:
+            while True:
+                batch = list(itertools.islice(rows, batch_size))
+                if not batch:
+                    return count
+                self.connection.executemany(
+                    "INSERT INTO transactions (date, amount, description, category, month, quarter) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", batch)
+                count += len(batch)
+
+    def _query(self, sql: str, params=()) -> list:
+        return self.connection.execute(sql, params).fetchall()
+
+    # --- аналитика в форме функций из main.py ---
+
+    def basic_stats(self) -> dict:
+        total_income, total_expense, count, count_income, count_expense = self._query(
+            "SELECT COALESCE(SUM(CASE WHEN amount > 0 THEN amount END), 0),"
+            " COALESCE(SUM(CASE WHEN amount < 0 THEN amount END), 0),"
+            " COUNT(*), COUNT(CASE WHEN amount > 0 THEN 1 END), COUNT(CASE WHEN amount < 0 THEN 1 END)"
+            " FROM transactions")[0]
+        return {
+            "total_income": total_income,
+            "total_expense": total_expense,
+            "balance": total_income + total_expense,
+            "transaction_count": count,
+            "income_transactions": count_income,
+            "expense_transactions": count_expense
+        }
+
+    def by_category(self) -> dict:
+        total_expense = self.basic_stats()["total_expense"]
+        rows = self._query(
+            "SELECT COALESCE(category, ?) AS cat, SUM(amount), COUNT(*) FROM transactions"
+            " GROUP BY cat ORDER BY MIN(id)", (f'{lcl.NO_CATEGORY}',))
+        totals = {
+            cat: {"sum": s, "count": n, "percent": (-s / -total_expense * 100) if total_expense else 0}
+            for cat, s, n in rows
+        }
+        return dict(sorted(totals.items(), key=lambda item: abs(item[1]["sum"]), reverse=True))
+
+    def _timeline(self, column: str) -> dict:
+        # column — "month" или "quarter"; периоды в порядке первой строки
+        result = {}
+        for period, income, expenses in self._query(
+                f"SELECT {column}, COALESCE(SUM(CASE WHEN amount >= 0 THEN amount END), 0),"
+                f" COALESCE(SUM(CASE WHEN amount < 0 THEN amount END), 0)"
+                f" FROM transactions WHERE {column} IS NOT NULL GROUP BY {column} ORDER BY MIN(id)"):
+            result[period] = {"income": income, "expenses": expenses, "categories": Counter()}
+        # при равном числе операций категория, встреченная раньше, идёт первой — как в Counter
+        for period, category, count in self._query(
+                f"SELECT {column}, COALESCE(category, ?) AS cat, COUNT(*) FROM transactions"
+                f" WHERE {column} IS NOT NULL AND amount < 0 GROUP BY {column}, cat ORDER BY MIN(id)",
+                (f'{lcl.NO_CATEGORY}',)):
+            result[period]["categories"][category] = count
+        for data in result.values():
+            counts = data["categories"]
+            data["categories"] = list(counts.elements())
+            data["top_categories"] = counts.most_common(3)
+        return result
+
+    def by_time(self) -> dict:
+        return self._timeline("month")
+
+    def by_quarter(self) -> dict:
+        return self._timeline("quarter")
+
+    def historical_spending(self) -> dict:
+        monthly_spending = {}
+        for cat, spent in self._query(
+                "SELECT COALESCE(category, ?) AS cat, -SUM(amount) FROM transactions"
+                " WHERE month IS NOT NULL AND amount < 0 GROUP BY cat, month ORDER BY MIN(id)",
+                (f'{lcl.NO_CATEGORY}',)):
+            monthly_spending.setdefault(cat, []).append(spent)
+        avg_spending = {cat: round(statistics.mean(vals), 2) for cat, vals in monthly_spending.items()}
+        top_cats = sorted(avg_spending.items(), key=lambda x: x[1], reverse=True)[:3]
+        return {
+            "average_spending": avg_spending,
+            "top_categories": top_cats
+        }
+
+    def actual_spending(self) -> dict:
+        return dict(self._query(
+            "SELECT COALESCE(category, ?) AS cat, -SUM(amount) FROM transactions WHERE amount < 0"
+            " GROUP BY cat ORDER BY MIN(id)", (f'{lcl.NO_CATEGORY}',)))
@@ -0,0 +1,167 @@
+import datetime
+from array import array
+from bisect import bisect_left, bisect_right
+
+import local as lcl
+from dates import decode_date
+from frame import TransactionFrame, NO_CODE, _category_labels
+
+# ==========================
+# ИНДЕКС ПО ДАТАМ С ПРЕФИКСНЫМИ СУММАМИ
+# ==========================
+
+
+class _Series:
+    """Отсортированные дни и накопленные суммы: доходы, расходы и их количество"""
+
+    __slots__ = ("days", "income", "expense", "income_count", "expense_count", "total")
+
+    def __init__(self):
+        self.days = array("l")
+        # элемент i — сумма по первым i строкам, поэтому длина на 1 больше числа строк
+        self.income = array("d", [0.0])
+        self.expense = array("d", [0.0])
+        self.income_count = array("l", [0])
+        self.expense_count = array("l", [0])
+        self.total = array("d", [0.0])
+
+    def append(self, day: int, amount: float):
+        self.days.append(day)
+        self.income.append(self.income[-1] + (amount if amount > 0 else 0.0))
+        self.expense.append(self.expense[-1] + (amount if amount < 0 else 0.0))
+        self.income_count.append(self.income_count[-1] + (amount > 0))
+        self.expense_count.append(self.expense_count[-1] + (amount < 0))
+        self.total.append(self.total[-1] + amount)
+
+    def span(self, start, end) -> tuple:
+        days = self.days
+        lo = 0 if start is None else bisect_left(days, start)
+        hi = len(days) if end is None else bisect_right(days, end)
+        return lo, max(lo, hi)
+
+
+class TimeIndex:
+    """Транзакции, упорядоченные по дате, с накопленными суммами — общими и по каждой категории.
+
+    Итоги за любой интервал дат (включительно) считаются двумя бинарными поисками, за O(log n).
+    Новые транзакции дописываются в конец, если их дата не раньше последней.
+    Строки с некорректной датой в индекс не попадают.
+    """
+
+    def __init__(self):
+        self._all = _Series()
+        self._categories = {}
+
+    @classmethod
+    def from_transactions(cls, transactions) -> "TimeIndex":
+        """Строит индекс по списку транзакций или TransactionFrame в любом порядке дат"""
+        rows = sorted(_day_rows(transactions), key=lambda row: row[0])
+        index = cls()
+        append = index._append
+        for day, amount, category in rows:
+            append(day, amount, category)
+        return index
+
+    def append(self, date, amount: float, category: str = None):
+        day = _day(date)
+        if day is None:
+            return
+        if self._all.days and day < self._all.days[-1]:
+            raise ValueError(f"date {date!r} is earlier than the last indexed date")
+        self._append(day, amount, f'{lcl.NO_CATEGORY}' if category is None else category)
+
+    def extend(self, transactions):
+        """Дописывает транзакции, упорядоченные по дате и не раньше уже проиндексированных"""
+        for day, amount, category in _day_rows(transactions):
+            if self._all.days and day < self._all.days[-1]:
+                raise ValueError("transactions must be appended in date order")
+            self._append(day, amount, category)
+        return self
+
+    def _append(self, day: int, amount: float, category: str):
+        self._all.append(day, amount)
+        series = self._categories.get(category)
+        if series is None:
+            series = self._categories[category] = _Series()
+        series.append(day, amount)
+
+    def __len__(self):
+        return len(self._all.days)
+
+    def categories(self) -> list:
+        return list(self._categories)
+
+    # --- запросы по интервалу [start, end]; None — без ограничения ---
+
+    def stats(self, start=None, end=None, category: str = None) -> dict:
+        """Итоги интервала в форме calculate_basic_stats"""
+        series = self._series(category)
+        if series is None:
+            return _stats(0.0, 0.0, 0, 0, 0)
+        lo, hi = series.span(_bound(start), _bound(end))
+        return _stats(series.income[hi] - series.income[lo],
+                      series.expense[hi] - series.expense[lo],
+                      hi - lo,
+                      series.income_count[hi] - series.income_count[lo],
+                      series.expense_count[hi] - series.expense_count[lo])
+
+    def income(self, start=None, end=None, category: str = None) -> float:
+        return self.stats(start, end, category)["total_income"]
+
+    def expense(self, start=None, end=None, category: str = None) -> float:
+        return self.stats(start, end, category)["total_expense"]
+
+    def balance(self, start=None, end=None, category: str = None) -> float:
+        return self.stats(start, end, category)["balance"]
+
+    def category_total(self, category: str, start=None, end=None) -> float:
+        """Сумма операций категории за интервал (как "sum" в calculate_by_category)"""
+        series = self._series(category)
+        if series is None:
+            return 0.0
+        lo, hi = series.span(_bound(start), _bound(end))
+        return series.total[hi] - series.total[lo]
+
+    def _series(self, category):
+        return self._all if category is None else self._categories.get(category)
+
+
+def _stats(income: float, expense: float, count: int, income_count: int, expense_count: int) -> dict:
+    return {
+        "total_income": income,
+        "total_expense": expense,
+        "balance": income + expense,
+        "transaction_count": count,
+        "income_transactions": income_count,
+        "expense_transactions": expense_count
+    }
+
+
+def _day(date):
+    if isinstance(date, datetime.date):
+        return date.toordinal()
+    info = decode_date(date)
+    return None if info is None else info.ordinal
+
+
+def _bound(date):
+    if date is None:
+        return None
+    day = _day(date)
+    if day is None:
+        raise ValueError(f"invalid date: {date!r}")
+    return day
+
+
+def _day_rows(transactions):
+    """(номер дня, сумма, категория) для строк с корректной датой"""
+    if isinstance(transactions, TransactionFrame):
+        labels = _category_labels(transactions)
+        for day, amount, code in zip(transactions.day_codes, transactions.amounts, transactions.category_codes):
+            if day != NO_CODE:
+                yield day, amount, labels[code]
+        return
+    for t in transactions:
+        day = _day(t["date"])
+        if day is not None:
+            yield day, t["amount"], t.get("category", f'{lcl.NO_CATEGORY}')
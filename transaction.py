@@ -0,0 +1,120 @@
+from collections.abc import MutableMapping
+from sys import intern
+
+from frame import TYPE_LABELS, INCOME_CODE, EXPENSE_CODE, NO_CODE
+
+# ==========================
+# КОМПАКТНАЯ ЗАПИСЬ ТРАНЗАКЦИИ
+# ==========================
+
+FIELDS = ("date", "amount", "description", "type", "category")
+
+# Названия категорий хранятся один раз, в записи — только номер
+CATEGORY_NAMES = []
+_category_index = {}
+
+
+def category_code(name: str) -> int:
+    code = _category_index.get(name)
+    if code is None:
+        code = len(CATEGORY_NAMES)
+        CATEGORY_NAMES.append(name)
+        _category_index[name] = code
+    return code
+
+
+def type_code(label: str) -> int:
+    try:
+        return TYPE_LABELS.index(label)
+    except ValueError:
+        raise ValueError(f"unknown transaction type: {label!r}") from None
+
+
+class Transaction(MutableMapping):
+    """Транзакция в __slots__: тип и категория — коды, дата — интернированная строка.
+
+    Ведёт себя как словарь с ключами date, amount, description, type и category
+    (t["amount"], t.get("category"), t["category"] = ...), поэтому подходит везде,
+    где раньше были словари, но занимает в несколько раз меньше памяти.
+    """
+
+    __slots__ = ("date", "amount", "description", "type_code", "category_code")
+
+    def __init__(self, date: str, amount: float, description: str, category: str = None):
+        self.date = intern(date)
+        self.amount = amount
+        self.description = description
+        self.type_code = INCOME_CODE if amount >= 0 else EXPENSE_CODE
+        self.category_code = NO_CODE if category is None else category_code(category)
+
+    @property
+    def type(self) -> str:
+        return TYPE_LABELS[self.type_code]
+
+    @property
+    def category(self):
+        code = self.category_code
+        return None if code == NO_CODE else CATEGORY_NAMES[code]
+
+    # --- интерфейс словаря ---
+
+    def __getitem__(self, key: str):
+        if key == "category":
+            code = self.category_code
+            if code == NO_CODE:
+                raise KeyError(key)
+            return CATEGORY_NAMES[code]
+        if key in FIELDS:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def get(self, key: str, default=None):
+        if key == "category":
+            code = self.category_code
+            return default if code == NO_CODE else CATEGORY_NAMES[code]
+        if key in FIELDS:
+            return getattr(self, key)
+        return default
+
+    def __setitem__(self, key: str, value):
+        if key == "category":
+            self.category_code = category_code(value)
+        elif key == "type":
+            self.type_code = type_code(value)
+        elif key == "date":
+            self.date = intern(value)
+        elif key in ("amount", "description"):
+            setattr(self, key, value)
+        else:
+            raise KeyError(key)
+
+    def __delitem__(self, key: str):
+        if key != "category" or self.category_code == NO_CODE:
+            raise KeyError(key)
+        self.category_code = NO_CODE
+
+    def __contains__(self, key) -> bool:
+        if key == "category":
+            return self.category_code != NO_CODE
+        return key in FIELDS
+
+    def __iter__(self):
+        yield from FIELDS[:4]
+        if self.category_code != NO_CODE:
+            yield "category"
+
+    def __len__(self):
+        return 4 if self.category_code == NO_CODE else 5
+
+    def __reduce__(self):
+        # коды категорий действуют только в своём процессе, поэтому передаётся название
+        return _rebuild_transaction, (self.date, self.amount, self.description, self.type_code, self.category)
+
+    def __repr__(self):
+        return f"Transaction({dict(self)!r})"
+
+
+def _rebuild_transaction(date, amount, description, code, category):
+    transaction = Transaction(date, amount, description, category)
+    transaction.type_code = code
+    return transaction
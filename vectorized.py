@@ -0,0 +1,159 @@
+from dates import month_key
+from frame import TransactionFrame, NO_CODE, _category_labels
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# ==========================
+# ГРУППИРОВКИ НА NUMPY
+# ==========================
+
+# Функции повторяют by_category/by_month/by_quarter/actual_by_category из frame.py и
+# возвращают те же словари. bincount складывает веса по порядку строк, как цикл в Python,
+# поэтому суммы совпадают до бита; там, где main.py зовёт sum(), зовётся sum().
+
+HAVE_NUMPY = np is not None
+
+
+def _columns(frame: TransactionFrame) -> tuple:
+    # массивы array.array отдаются в numpy без копирования
+    amounts = np.frombuffer(frame.amounts, dtype=frame.amounts.typecode)
+    month_codes = np.frombuffer(frame.month_codes, dtype=frame.month_codes.typecode)
+    # категория -1 (без категории) становится 0, остальные сдвигаются на 1
+    category_codes = np.frombuffer(frame.category_codes, dtype=frame.category_codes.typecode).astype(np.intp) + 1
+    return amounts, month_codes, category_codes
+
+
+def _labels(frame: TransactionFrame) -> list:
+    # в порядке сдвинутых кодов: 0 — «без категории»
+    labels = _category_labels(frame)
+    return labels[-1:] + labels[:-1]
+
+
+def _first_index(codes, size: int):
+    """Номер первой строки для каждого кода 0..size-1 (len(codes), если кода нет)"""
+    first = np.full(size, len(codes), dtype=np.intp)
+    np.minimum.at(first, codes, np.arange(len(codes)))
+    return first
+
+
+def _first_seen(codes, size: int):
+    """Встречающиеся коды 0..size-1 в порядке первого появления (без сортировки всех строк)"""
+    first = _first_index(codes, size)
+    present = np.flatnonzero(first < len(codes))
+    return present[np.argsort(first[present], kind="stable")]
+
+
+def _sum(total: float, count: int):
+    # цикл в Python начинает с 0 (int), и пустая сумма так и остаётся int
+    return total if count else 0
+
+
+def by_category(frame: TransactionFrame) -> dict:
+    amounts, _, codes = _columns(frame)
+    labels = _labels(frame)
+    size = len(labels)
+    sums = np.bincount(codes, weights=amounts, minlength=size).tolist()
+    counts = np.bincount(codes, minlength=size).tolist()
+    # общий расход — встроенным sum(), как в calculate_by_category (на Python 3.12+ с компенсацией)
+    total_expense = sum(amounts[amounts < 0].tolist())
+    totals = {}
+    for code in _first_seen(codes, size).tolist():
+        percent = (-sums[code] / -total_expense * 100) if total_expense else 0
+        totals[labels[code]] = {"sum": sums[code], "count": counts[code], "percent": percent}
+    return dict(sorted(totals.items(), key=lambda item: abs(item[1]["sum"]), reverse=True))
+
+
+def _grouped(amounts, groups, codes, labels: list, valid) -> list:
+    """[(код группы, данные)] в порядке первого появления группы; данные как в frame.by_month"""
+    amounts = amounts[valid]
+    groups = groups[valid]
+    codes = codes[valid]
+    if not len(groups):
+        return []
+    # коды групп (месяцев, кварталов) идут подряд, поэтому хватает плотного диапазона от минимума
+    offset = int(groups.min())
+    dense = groups - offset
+    span = int(dense.max()) + 1
+    order_dense = _first_seen(dense, span)
+    order = order_dense + offset
+    size = len(order)
+    # номер группы по порядку появления для каждой строки
+    rank = np.zeros(span, dtype=np.intp)
+    rank[order_dense] = np.arange(size)
+    index = rank[dense]
+
+    income = amounts >= 0
+    income_sums = np.bincount(index[income], weights=amounts[income], minlength=size).tolist()
+    income_counts = np.bincount(index[income], minlength=size).tolist()
+    expense = ~income
+    expense_sums = np.bincount(index[expense], weights=amounts[expense], minlength=size).tolist()
+    expense_counts = np.bincount(index[expense], minlength=size).tolist()
+
+    # список категорий расходов по группам в порядке строк
+    expense_index = index[expense]
+    expense_codes = codes[expense]
+    # номеров групп немного: int16 позволяет numpy сортировать устойчиво поразрядно
+    by_group = np.argsort(expense_index.astype(np.int16) if size < 1 << 15 else expense_index, kind="stable")
+    label_array = np.array(labels, dtype=object)
+    names = label_array[expense_codes[by_group]].tolist()
+    bounds = np.cumsum(expense_counts).tolist()
+
+    # top-3 как у Counter.most_common: по убыванию частоты, при равенстве — по первому появлению
+    width = len(labels)
+    pairs = expense_index * width + expense_codes
+    pair_counts = np.bincount(pairs, minlength=size * width)
+    pair_first = _first_index(pairs, size * width)
+    pair_values = np.flatnonzero(pair_counts)
+    pair_group = pair_values // width
+    ranked = np.lexsort((pair_first[pair_values], -pair_counts[pair_values], pair_group))
+    top = [[] for _ in range(size)]
+    for pair in pair_values[ranked].tolist():
+        group, code = divmod(pair, width)
+        if len(top[group]) < 3:
+            top[group].append((labels[code], int(pair_counts[pair])))
+
+    result = []
+    start = 0
+    for position, group_code in enumerate(order.tolist()):
+        end = bounds[position]
+        result.append((group_code, {
+            "income": _sum(income_sums[position], income_counts[position]),
+            "expenses": _sum(expense_sums[position], expense_counts[position]),
+            "categories": names[start:end],
+            "top_categories": top[position],
+        }))
+        start = end
+    return result
+
+
+def by_month(frame: TransactionFrame) -> dict:
+    amounts, month_codes, codes = _columns(frame)
+    valid = month_codes != NO_CODE
+    return {month_key(code): data
+            for code, data in _grouped(amounts, month_codes, codes, _labels(frame), valid)}
+
+
+def by_quarter(frame: TransactionFrame) -> dict:
+    amounts, month_codes, codes = _columns(frame)
+    valid = month_codes != NO_CODE
+    result = {}
+    for code, data in _grouped(amounts, month_codes // 3, codes, _labels(frame), valid):
+        year, quarter = divmod(code, 4)
+        result[f"{year}-Q{quarter + 1}"] = data
+    return result
+
+
+def actual_by_category(frame: TransactionFrame) -> dict:
+    amounts, _, codes = _columns(frame)
+    expense = amounts < 0
+    codes = codes[expense]
+    if not len(codes):
+        return {}
+    if not codes.all():
+        raise KeyError("category")
+    labels = _labels(frame)
+    sums = np.bincount(codes, weights=-amounts[expense], minlength=len(labels)).tolist()
+    return {labels[code]: sums[code] for code in _first_seen(codes, len(labels)).tolist()}